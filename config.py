@@ -7,6 +7,8 @@ PLAYER_2_NAME = '3.1'
 PLAYER_2_PATH = './old_bots'
 # GAME PROGRESS IS RECORDED HERE
 GAME_LOG_FILENAME = 'gamelog'
+# MATCH AND ROUND SUMMARIES ARE APPENDED HERE, SET TO None TO DISABLE
+RESULTS_DB_FILENAME = 'results.db'
 # PLAYER_LOG_SIZE_LIMIT IS IN BYTES
 PLAYER_LOG_SIZE_LIMIT = 524288
 # STARTING_GAME_CLOCK AND TIMEOUTS ARE IN SECONDS
@@ -14,11 +14,10 @@ are awarded a card and both players contribute to the pot. Bids are not capped.
 '''
 
 ''' 
-Note that changes made to the engine.py file will also have to be replicated in the 
-each of the skeleton bot files accordingly
+The betting and auction rules live in rules/states.py, which the engine and every bot 
+use. The engine only adds the deck, the dealt cards and the showdown
 '''
 
-from collections import namedtuple
 from threading import Thread
 from queue import Queue
 import time
@@ -31,50 +30,34 @@ import os
 
 sys.path.append(os.getcwd())
 from config import *
-
-FoldAction = namedtuple('FoldAction', [])
-CallAction = namedtuple('CallAction', [])
-CheckAction = namedtuple('CheckAction', [])
-# we coalesce BetAction and RaiseAction for convenience
-RaiseAction = namedtuple('RaiseAction', ['amount'])
-BidAction = namedtuple('BidAction', ['amount'])
-TerminalState = namedtuple('TerminalState', ['deltas', 'bids', 'previous_state'])
+from results import ResultsStore
+from rules.actions import FoldAction, CallAction, CheckAction, RaiseAction, BidAction
+from rules.codec import ACTION_TYPES, encode_action, decode_action, encode_clause
+from rules import states
+from rules.states import TerminalState
 
 # will not include a "bid" street as a community card is not being revealed to the players
 STREET_NAMES = ['Flop', 'Turn', 'River']
-DECODE = {'F': FoldAction, 'C': CallAction, 'K': CheckAction, 'R': RaiseAction, 'A': BidAction}
-CCARDS = lambda cards: ','.join(map(str, cards))
+PHRASES = {FoldAction: ' folds', CallAction: ' calls', CheckAction: ' checks', BidAction: ' bids '}
 PCARDS = lambda cards: '[{}]'.format(' '.join(map(str, cards)))
 PVALUE = lambda name, value: ', {} ({})'.format(name, value)
 STATUS = lambda players: ''.join([PVALUE(p.name, p.bankroll) for p in players])
 
-# Socket encoding scheme:
-#
-# T#.### the player's game clock
-# P# the player's index
-# H**,** the player's hand in common format
-# F a fold action in the round history
-# C a call action in the round history
-# K a check action in the round history
-# R### a raise action in the round history
-# A### a bid action in the round history
-# N**, ** the player's hand after the auction in common format
-# B**,**,**,**,** the board cards in common format
-# O**,** the opponent's hand in common format
-# D### the player's bankroll delta from the round
-# Q game over
+# Socket encoding scheme: see rules/codec.py, which both the engine and the bots use.
 #
-# Clauses are separated by spaces
-# Messages end with '\n'
 # The engine expects a response of K at the end of the round as an ack,
 # otherwise a response which encodes the player's action
 # Action history is sent once, including the player's actions
 
 
-class RoundState(namedtuple('_RoundState', ['button', 'street', 'auction', 'bids', 'pips', 'stacks', 'hands', 'deck', 'previous_state'])):
+class RoundState(states.RoundState):
     '''
-    Encodes the game tree for one round of poker.
+    Encodes the game tree for one round of poker, including the deck and both players' hands.
     '''
+    __slots__ = ()
+
+    STARTING_STACK = STARTING_STACK
+    BIG_BLIND = BIG_BLIND
 
     def showdown(self):
         '''
@@ -88,110 +71,18 @@ class RoundState(namedtuple('_RoundState', ['button', 'street', 'auction', 'bids
             delta = self.stacks[0] - STARTING_STACK
         else:  # split the pot
             delta = (self.stacks[0] - self.stacks[1]) // 2
-        return TerminalState([delta, -delta], self.bids, self)
-
-    def legal_actions(self):
-        '''
-        Returns a set which corresponds to the active player's legal moves.
-        '''
-        if self.auction: 
-            return {BidAction}
-        active = self.button % 2
-        continue_cost = self.pips[1-active] - self.pips[active]
-        if continue_cost == 0:
-            # we can only raise the stakes if both players can afford it
-            bets_forbidden = (self.stacks[0] == 0 or self.stacks[1] == 0)
-            return {CheckAction} if bets_forbidden else {CheckAction, RaiseAction}
-        # continue_cost > 0
-        # similarly, re-raising is only allowed if both players can afford it
-        raises_forbidden = (continue_cost >= self.stacks[active] or self.stacks[1-active] == 0)
-        return {FoldAction, CallAction} if raises_forbidden else {FoldAction, CallAction, RaiseAction}
-
-    def raise_bounds(self):
-        '''
-        Returns a tuple of the minimum and maximum legal raises.
-        '''
-        active = self.button % 2
-        continue_cost = self.pips[1-active] - self.pips[active]
-        # can not raise to a value opponent can't afford.
-        max_contribution = min(self.stacks[active], self.stacks[1-active] + continue_cost)
-        min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
-        return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
-
-    def bid_bounds(self):
-        '''
-        Returns a tuple of the minimum and maximum legal bid amounts
-        '''
-        active = self.button % 2
-        min_bid = 0
-        max_bid = self.stacks[active]
-        return (min_bid, max_bid)
-
-    def proceed_street(self):
-        '''
-        Resets the players' pips and advances the game tree to the next round of betting.
-        '''
-        if self.street == 5:
-            return self.showdown()
-        if self.street == 0:        # immediately after flop is dealt, we enter the auction
-            return RoundState(1, 3, True, self.bids, [0, 0], self.stacks, self.hands, self.deck, self)
-        # new_street = 3 if self.street == 0 else self.street + 1
-        # return RoundState(1, new_street, [0, 0], self.stacks, self.hands, self.deck, self)
-        return RoundState(1, self.street + 1, False, self.bids, [0, 0], self.stacks, self.hands, self.deck, self)
+        return TerminalState((delta, -delta), self.bids, self)
 
-    def proceed(self, action):
+    def auction_hands(self, bids):
         '''
-        Advances the game tree by one action performed by the active player.
+        Deals the auction card to the winner, or one card to each player on a tie.
         '''
-        active = self.button % 2
-        if isinstance(action, FoldAction):
-            delta = self.stacks[0] - STARTING_STACK if active == 0 else STARTING_STACK - self.stacks[1]
-            return TerminalState([delta, -delta], self.bids, self)
-        if isinstance(action, CallAction):
-            if self.button == 0:  # sb calls bb preflop
-                return RoundState(1, 0, self.auction, self.bids, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.deck, self)
-            # both players acted
-            new_pips = list(self.pips)
-            new_stacks = list(self.stacks)
-            contribution = new_pips[1-active] - new_pips[active]
-            new_stacks[active] -= contribution
-            new_pips[active] += contribution
-            state = RoundState(self.button + 1, self.street, self.auction, self.bids, new_pips, new_stacks, self.hands, self.deck, self)
-            return state.proceed_street()
-        if isinstance(action, CheckAction):
-            if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
-                return self.proceed_street()
-            # let opponent act
-            return RoundState(self.button + 1, self.street, self.auction, self.bids, self.pips, self.stacks, self.hands, self.deck, self)
-        if isinstance(action, BidAction):
-            self.bids[active] = action.amount 
-            if None not in self.bids:       # both players have submitted bids and we deal the extra card
-                # case in which bids are equal, both players receive card
-                if self.bids[0] == self.bids[1]:
-                    self.hands[0].append(self.deck.peek(48)[-1])
-                    self.hands[1].append(self.deck.peek(48)[-2])
-                    new_stacks = list(self.stacks)
-                    new_stacks[0] -= self.bids[0]
-                    new_stacks[1] -= self.bids[1]
-                    state = RoundState(1, self.street, False, self.bids, self.pips, new_stacks, self.hands, self.deck, self)
-                else:
-                # case in which bids are not equal
-                    winner = self.bids.index(max(self.bids))
-                    self.hands[winner].append(self.deck.peek(48)[-1])
-                    new_stacks = list(self.stacks)
-                    new_stacks[winner] -= self.bids[1 - winner]
-                    state = RoundState(1, self.street, False, self.bids, self.pips, new_stacks, self.hands, self.deck, self)
-                return state
-            else:
-                return RoundState(self.button + 1, self.street, True, self.bids, self.pips, self.stacks, self.hands, self.deck, self)
-        if isinstance(action, RaiseAction):
-            new_pips = list(self.pips)
-            new_stacks = list(self.stacks)
-            contribution = action.amount - new_pips[active]
-            new_stacks[active] -= contribution
-            new_pips[active] += contribution
-            return RoundState(self.button + 1, self.street, self.auction, self.bids, new_pips, new_stacks, self.hands, self.deck, self)
-        
+        second_last, last = self.deck.peek(48)[-2:]
+        if bids[0] == bids[1]:
+            return (self.hands[0] + [last], self.hands[1] + [second_last])
+        if bids[0] > bids[1]:
+            return (self.hands[0] + [last], self.hands[1])
+        return (self.hands[0], self.hands[1] + [last])
 
 
 class Player():
@@ -205,6 +96,7 @@ class Player():
         self.game_clock = STARTING_GAME_CLOCK
         self.bankroll = 0
         self.commands = None
+        self.version = None
         self.bot_subprocess = None
         self.socketfile = None
         self.bytes_queue = Queue()
@@ -220,6 +112,8 @@ class Player():
                     isinstance(commands['build'], list) and
                     isinstance(commands['run'], list)):
                 self.commands = commands
+                if len(commands['run']) > 0:
+                    self.version = os.path.splitext(os.path.basename(commands['run'][-1]))[0]
             else:
                 print(self.name, 'commands.json missing command')
         except FileNotFoundError:
@@ -287,7 +181,7 @@ class Player():
         '''
         if self.socketfile is not None:
             try:
-                self.socketfile.write('Q\n')
+                self.socketfile.write(encode_clause('Q') + '\n')
                 self.socketfile.close()
             except socket.timeout:
                 print('Timed out waiting for', self.name, 'to disconnect')
@@ -321,7 +215,7 @@ class Player():
         if self.socketfile is not None and self.game_clock > 0.:
             clause = ''
             try:
-                player_message[0] = 'T{:.3f}'.format(self.game_clock)
+                player_message[0] = encode_clause('T', self.game_clock)
                 message = ' '.join(player_message) + '\n'
                 del player_message[1:]  # do not send redundant action history
                 start_time = time.perf_counter()
@@ -333,24 +227,23 @@ class Player():
                     self.game_clock -= end_time - start_time
                 if self.game_clock <= 0.:
                     raise socket.timeout
-                action = DECODE[clause[0]]
-                if action in legal_actions:
-                    if clause[0] == 'R':
-                        amount = int(clause[1:])
+                action = decode_action(clause)
+                action_type = ACTION_TYPES[clause[0]]
+                if action_type in legal_actions:
+                    if action_type is RaiseAction:
                         min_raise, max_raise = round_state.raise_bounds()
-                        if min_raise <= amount <= max_raise:
-                            return action(amount)
-                    elif clause[0] == 'A':
-                        amount = int(clause[1:])
+                        if min_raise <= action.amount <= max_raise:
+                            return action
+                    elif action_type is BidAction:
                         min_bid, max_bid = round_state.bid_bounds()
-                        if min_bid <= amount <= max_bid:
-                            return action(amount)
+                        if min_bid <= action.amount <= max_bid:
+                            return action
                     else:
-                        return action()
-                if clause[0] in ('R', 'A'):
-                    game_log.append(self.name + ' attempted illegal ' + action.__name__ + ' with amount ' + str(int(clause[1:])))
+                        return action
+                if action_type._fields:
+                    game_log.append(self.name + ' attempted illegal ' + action_type.__name__ + ' with amount ' + str(action.amount))
                 else:
-                    game_log.append(self.name + ' attempted illegal ' + action.__name__)
+                    game_log.append(self.name + ' attempted illegal ' + action_type.__name__)
 
             except socket.timeout:
                 error_message = self.name + ' ran out of time'
@@ -362,21 +255,8 @@ class Player():
                 game_log.append(error_message)
                 print(error_message)
                 self.game_clock = 0.
-            # except (IndexError, KeyError, ValueError):
-            #     # TODO: responses are being misformatted when running game
-            #     game_log.append(self.name + ' response misformatted: ' + str(clause))
-            except IndexError:
-                # TODO: responses are being misformatted when running game
-                game_log.append(self.name + ' response misformatted: ' + str(clause))
-                game_log.append('IndexError')
-            except KeyError:
-                # TODO: responses are being misformatted when running game
-                game_log.append(self.name + ' response misformatted: ' + str(clause))
-                game_log.append('KeyError')
-            except ValueError:
-                # TODO: responses are being misformatted when running game
+            except (IndexError, KeyError, ValueError):
                 game_log.append(self.name + ' response misformatted: ' + str(clause))
-                game_log.append('ValueError')
         # set a base bid action of 0 if pokerbot fails to submit legal bid action
         if BidAction in legal_actions: 
             return BidAction(0)
@@ -402,24 +282,24 @@ class Game():
                 if len(round_state.hands[i]) > 2:
                     new_cards = PCARDS(round_state.hands[i]).split(" ")
                     self.log.append('{} won the auction and was dealt {}'.format(players[i].name, "["+new_cards[-1]))
-            self.player_messages[0].append('P0')
-            self.player_messages[0].append('N' + ','.join([str(x) for x in round_state.stacks]) + '_' + ','.join([str(x) for x in round_state.bids]) + '_' + CCARDS(round_state.hands[0]))
-            self.player_messages[1].append('P1')
-            self.player_messages[1].append('N' + ','.join([str(x) for x in round_state.stacks]) + '_' + ','.join([str(x) for x in round_state.bids]) + '_' + CCARDS(round_state.hands[1]))
+            self.player_messages[0].append(encode_clause('P', 0))
+            self.player_messages[0].append(encode_clause('N', (round_state.stacks, round_state.bids, round_state.hands[0])))
+            self.player_messages[1].append(encode_clause('P', 1))
+            self.player_messages[1].append(encode_clause('N', (round_state.stacks, round_state.bids, round_state.hands[1])))
 
         if round_state.street == 0 and round_state.button == 0:
             self.log.append('{} posts the blind of {}'.format(players[0].name, SMALL_BLIND))
             self.log.append('{} posts the blind of {}'.format(players[1].name, BIG_BLIND))
             self.log.append('{} dealt {}'.format(players[0].name, PCARDS(round_state.hands[0])))
             self.log.append('{} dealt {}'.format(players[1].name, PCARDS(round_state.hands[1])))
-            self.player_messages[0] = ['T0.', 'P0', 'H' + CCARDS(round_state.hands[0])]
-            self.player_messages[1] = ['T0.', 'P1', 'H' + CCARDS(round_state.hands[1])]
+            self.player_messages[0] = ['T0.', encode_clause('P', 0), encode_clause('H', round_state.hands[0])]
+            self.player_messages[1] = ['T0.', encode_clause('P', 1), encode_clause('H', round_state.hands[1])]
         elif round_state.street > 0 and round_state.button == 1:
             board = round_state.deck.peek(round_state.street)
             self.log.append(STREET_NAMES[round_state.street - 3] + ' ' + PCARDS(board) +
                             PVALUE(players[0].name, STARTING_STACK-round_state.stacks[0]) +
                             PVALUE(players[1].name, STARTING_STACK-round_state.stacks[1]))
-            compressed_board = 'B' + CCARDS(board)
+            compressed_board = encode_clause('B', board)
             self.player_messages[0].append(compressed_board)
             self.player_messages[1].append(compressed_board)
             
@@ -427,21 +307,13 @@ class Game():
         '''
         Incorporates action information into the game log and player messages.
         '''
-        if isinstance(action, FoldAction):
-            phrasing = ' folds'
-            code = 'F'
-        elif isinstance(action, CallAction):
-            phrasing = ' calls'
-            code = 'C'
-        elif isinstance(action, CheckAction):
-            phrasing = ' checks'
-            code = 'K'
-        elif isinstance(action, BidAction):
-            phrasing = ' bids ' + str(action.amount)
-            code = 'A' + str(action.amount)
-        else:  # isinstance(action, RaiseAction)
+        if isinstance(action, RaiseAction):
             phrasing = (' bets ' if bet_override else ' raises to ') + str(action.amount)
-            code = 'R' + str(action.amount)
+        elif isinstance(action, BidAction):
+            phrasing = PHRASES[BidAction] + str(action.amount)
+        else:
+            phrasing = PHRASES[type(action)]
+        code = encode_action(action)
         self.log.append(name + phrasing)
         self.player_messages[0].append(code)
         self.player_messages[1].append(code)
@@ -454,8 +326,8 @@ class Game():
         if FoldAction not in previous_state.legal_actions():
             self.log.append('{} shows {}'.format(players[0].name, PCARDS(previous_state.hands[0])))
             self.log.append('{} shows {}'.format(players[1].name, PCARDS(previous_state.hands[1])))
-            self.player_messages[0].append('O' + CCARDS(previous_state.hands[1]))
-            self.player_messages[1].append('O' + CCARDS(previous_state.hands[0]))
+            self.player_messages[0].append(encode_clause('O', previous_state.hands[1]))
+            self.player_messages[1].append(encode_clause('O', previous_state.hands[0]))
         self.log.append('{} awarded {}'.format(players[0].name, round_state.deltas[0]))
         self.log.append('{} awarded {}'.format(players[1].name, round_state.deltas[1]))
         if None in round_state.bids:
@@ -463,8 +335,8 @@ class Game():
         else:
             self.log.append('Players submitted bids of {} and {}'.format(round_state.bids[0], round_state.bids[1]))
         
-        self.player_messages[0].append('D' + str(round_state.deltas[0]))
-        self.player_messages[1].append('D' + str(round_state.deltas[1]))
+        self.player_messages[0].append(encode_clause('D', round_state.deltas[0]))
+        self.player_messages[1].append(encode_clause('D', round_state.deltas[1]))
 
     def run_round(self, players):
         '''
@@ -472,24 +344,34 @@ class Game():
         '''
         deck = eval7.Deck()
         deck.shuffle()
-        hands = [deck.deal(2), deck.deal(2)]
+        hands = (deck.deal(2), deck.deal(2))
         auction = False
-        bids = [None, None]
-        pips = [SMALL_BLIND, BIG_BLIND]
-        stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+        bids = (None, None)
+        pips = (SMALL_BLIND, BIG_BLIND)
+        stacks = (STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND)
         round_state = RoundState(0, 0, auction, bids, pips, stacks, hands, deck, None)
         while not isinstance(round_state, TerminalState):
             self.log_round_state(players, round_state)
             active = round_state.button % 2
             player = players[active]
             action = player.query(round_state, self.player_messages[active], self.log)
-            bet_override = (round_state.pips == [0, 0])
+            bet_override = (round_state.pips == (0, 0))
             self.log_action(player.name, action, bet_override)
             round_state = round_state.proceed(action)
         self.log_terminal_state(players, round_state)
         for player, player_message, delta in zip(players, self.player_messages, round_state.deltas):
             player.query(round_state, player_message, self.log)
             player.bankroll += delta
+        return round_state
+
+    def record_round(self, store, match_id, round_num, players, terminal_state):
+        '''
+        Adds a summary of a finished round to the results store.
+        '''
+        previous_state = terminal_state.previous_state
+        showdown = FoldAction not in previous_state.legal_actions()
+        store.add_round(match_id, round_num, [p.name for p in players], [p.version for p in players],
+                        terminal_state.deltas, terminal_state.bids, previous_state.street, showdown)
 
     def run(self):
         '''
@@ -508,13 +390,22 @@ class Game():
         for player in players:
             player.build()
             player.run()
+        store = ResultsStore(RESULTS_DB_FILENAME) if RESULTS_DB_FILENAME else None
+        if store is not None:
+            match_id = store.begin_match([p.name for p in players], [p.version for p in players])
         for round_num in range(1, NUM_ROUNDS + 1):
             self.log.append('')
             self.log.append('Round #' + str(round_num) + STATUS(players))
-            self.run_round(players)
+            terminal_state = self.run_round(players)
+            if store is not None:
+                self.record_round(store, match_id, round_num, players, terminal_state)
             players = players[::-1]
         self.log.append('')
         self.log.append('Final' + STATUS(players))
+        if store is not None:
+            ordered = players if NUM_ROUNDS % 2 == 0 else players[::-1]
+            store.end_match(match_id, NUM_ROUNDS, [p.bankroll for p in ordered])
+            store.close()
         for player in players:
             player.stop()
         name = GAME_LOG_FILENAME + '.txt'
@@ -3,9 +3,20 @@ from skeleton.states import GameState, TerminalState, RoundState
 from skeleton.states import NUM_ROUNDS, STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from skeleton.bot import Bot
 from skeleton.runner import parse_args, run_bot
+from skeleton.clock import ClockBudget, spot_weight
+from skeleton.log import Logger, INFO
+from skeleton import preflop, flop
+from skeleton.cache import EquityCache, canonical_situation
+from skeleton.disk_cache import DiskCache, EXACT
+from skeleton.equity import exact_cost, exact_equity, adaptive_equity, settled, pool_equities, ADAPTIVE_CHUNK
+from skeleton.equity import HandSimulation
+from skeleton.pool import EquityPool, available_cpus
+from skeleton.auction import auction_value, best_bid, AUCTION_CHUNK
+from skeleton.ranges import stratified_equity
 import random
-import eval7
 import math
+import time
+import numpy as np
 
 
 class Player(Bot):
@@ -23,9 +34,34 @@ class Player(Bot):
         Returns:
         Nothing.
         '''
-        self.MONTE_CARLO_ITERS = 200
+        self.MONTE_CARLO_ITERS = 200  # used until the clock budget has measured an iteration
+        self.clock = ClockBudget()
+        self.log = Logger(INFO)
+        self.preflop_table = preflop.load_table()  # None if the table has not been generated
+        self.flop_table = flop.load_table()  # memory-mapped, None if the table has not been generated
+        self.PONDER_CHUNK = 500  # batches much smaller than this are dominated by numpy call overhead
+        self.PONDER_LIMIT = 5000
+        self.EXACT_EVALS_PER_ITER = 2  # an enumerated evaluation costs about half a batched deal
+        self.ITERS_PER_AUCTION_SAMPLE = 2.5  # an auction sample evaluates five hands, a deal two
+        self.STRATIFY_RUNOUTS = 2  # runouts per opponent holding a turn budget must cover before it is stratified
+        self.rng = np.random.default_rng()
+        # extra sampling processes, off by default: they compete with the opponent's bot for the machine's
+        # cores, so only opt in where the bot has cores of its own
+        self.POOL_WORKERS = 0
+        # forked here, before run_bot connects, so starting the workers costs no game clock
+        workers = min(self.POOL_WORKERS, available_cpus() - 1)
+        self.pool = EquityPool(workers) if workers > 0 else None
         self.rounds_fold_to_raise = 0
+        self.opponent_bids = []
+        self.POST_AUCTION_PRIOR = (5, 40.)  # pseudo-rounds and the chips they bet after the auction in total per round
+        self.post_auction_betting = list(self.POST_AUCTION_PRIOR)  # [rounds, chips bet after the auction in total]
+        self.auction_pot = None  # the pot when we bid this round
         self.PROB_THRESHOLD = 0.6
+        # keyed by canonical (my cards, board cards, opponent card count) situations and kept across rounds
+        self.simulations = EquityCache(100000)  # situation -> Equity
+        self.exact_strengths = EquityCache(100000)  # situation -> strength
+        self.disk_cache = DiskCache()  # shared with other bot processes and earlier games, written once per round
+        self.hand = None  # the HandSimulation of the current hand after the auction
 
     def handle_new_round(self, game_state, round_state, active):
         '''
@@ -39,7 +75,7 @@ class Player(Bot):
         Returns:
         Nothing.
         '''
-        print(f'Round {game_state.round_num}')
+        self.log.info('Round %d', game_state.round_num)
         my_bankroll = game_state.bankroll  # the total number of chips you've gained or lost from the beginning of the game to the start of this round
         game_clock = game_state.game_clock  # the total number of seconds your bot has left to play this game
         round_num = game_state.round_num  # the round number from 1 to NUM_ROUNDS
@@ -61,10 +97,17 @@ class Player(Bot):
         if rank1 == rank2 or (rank1 in "AKQJT9876" and rank2 in "AKQJT9876"):
             self.strong_hole = True
         
-        strength_w_auction, strength_wo_auction = self.calculate_strength(round_state, active, self.MONTE_CARLO_ITERS)
+        self.hand = None
+        self.auction_pot = None
+        self.clock.new_round()
+        if self.preflop_table is not None:
+            strength_w_auction, strength_wo_auction = self.preflop_table[preflop.hand_class(my_cards)]
+        else:
+            strength_w_auction, strength_wo_auction = self.calculate_strength(round_state, active, self.budget(game_state))
         self.strength_w_auction = strength_w_auction
         self.strength_wo_auction = strength_wo_auction
-        print(f'\tHand: {" ".join(my_cards)}')
+        self.strength = (strength_w_auction + strength_wo_auction) / 2
+        self.log.debug('\tHand: %s', my_cards)
 
     def handle_round_over(self, game_state, terminal_state, active):
         '''
@@ -78,13 +121,71 @@ class Player(Bot):
         Returns:
         Nothing.
         '''
-        print()
+        self.log.info('')
+        self.log.flush()
         my_delta = terminal_state.deltas[active]  # your bankroll change from this round
         previous_state = terminal_state.previous_state  # RoundState before payoffs
         street = previous_state.street  # 0, 3, 4, or 5 representing when this round ended
         my_cards = previous_state.hands[active]  # your cards
         opp_cards = previous_state.hands[1-active]  # opponent's cards or [] if not revealed
-        pass
+        bids = previous_state.bids
+        if None not in bids:
+            self.opponent_bids.append(bids[1-active])
+            if self.auction_pot is not None:
+                final_pot = 2 * STARTING_STACK - previous_state.stacks[0] - previous_state.stacks[1]
+                payments = bids[0] + bids[1] if bids[0] == bids[1] else min(bids)
+                self.post_auction_betting[0] += 1
+                self.post_auction_betting[1] += final_pot - self.auction_pot - payments
+        self.disk_cache.flush()
+        if game_state.round_num % 100 == 0:
+            self.log.info('Equity cache hit rates: simulations %.3f, exact %.3f, disk %.3f',
+                          self.simulations.hit_rate(), self.exact_strengths.hit_rate(), self.disk_cache.hit_rate())
+
+    def ponder(self, game_state, round_state, active, cancelled):
+        '''
+        Refines equity estimates for the spots we are likely to face next while the opponent thinks.
+
+        Arguments:
+        game_state: the GameState object.
+        round_state: the RoundState object we just acted in.
+        active: your player's index.
+        cancelled: set when the engine's next message arrives.
+
+        Returns:
+        Nothing.
+        '''
+        street = round_state.street
+        if street < 3:
+            return
+        my_cards = round_state.hands[active]
+        board_cards = round_state.deck[:street]
+        if BidAction in round_state.legal_actions():
+            if self.flop_table is not None:
+                return
+            # losing the auction leaves our hand known, so its flop equity can be computed now
+            opp = 3
+            situation = canonical_situation(my_cards, board_cards, opp)
+        else:
+            # the opponent may raise, which asks us to act again on the same board
+            situation = self.situation(round_state, active)
+            opp = situation[2]
+        self.load_stored(situation)
+        if situation in self.exact_strengths:
+            return
+        if self.exact_evals(situation) <= self.EXACT_EVALS_PER_ITER * self.PONDER_LIMIT:
+            strength = exact_equity(*situation, cancelled=cancelled)
+            if strength is not None:
+                self.exact_strengths.put(situation, strength)
+                self.disk_cache.put(situation, strength)
+            return
+        result = self.simulations.get(situation)
+        if result is None:
+            result = self.hand_simulation(my_cards, opp).prior(board_cards)
+        while not cancelled.is_set() and (result is None or result.samples < self.PONDER_LIMIT):
+            # pondering runs on the opponent's time, so it stays on this process even with a pool
+            result = self.simulate(my_cards, board_cards, opp, (result.samples if result else 0) + self.PONDER_CHUNK, prior=result, parallel=False)
+            self.simulations.put(situation, result)
+            self.disk_cache.put(situation, result)
     
     def get_action(self, game_state, round_state, active):
         '''
@@ -113,28 +214,37 @@ class Player(Bot):
         my_contribution = STARTING_STACK - my_stack  # the number of chips you have contributed to the pot
         opp_contribution = STARTING_STACK - opp_stack  # the number of chips your opponent has contributed to the pot
         pot = my_contribution + opp_contribution
-        strength_diff = self.strength_w_auction - self.strength_wo_auction
 
         # Bidding logic
         if BidAction in legal_actions:
-            max_bid = 200 if strength_diff > 0.2 else 100
-            bid = int(max_bid * self.strength_w_auction) if not self.enough_chips_to_win_game(game_state, active) and \
-                self.strength_w_auction > self.PROB_THRESHOLD \
-                else 0
-            return BidAction(bid)
+            if self.enough_chips_to_win_game(game_state, active):
+                return BidAction(0)
+            self.strength_w_auction, self.strength_wo_auction, strength_tie = self.auction_strengths(game_state, my_cards, board_cards, pot)
+            # the card is played for the pot at the end of the hand, not the few chips in it now
+            rounds, chips = self.post_auction_betting
+            final_pot = pot + min(chips / rounds, 2 * min(my_stack, opp_stack))
+            self.auction_pot = pot
+            return BidAction(best_bid(self.strength_w_auction, self.strength_wo_auction, strength_tie, final_pot,
+                                      self.opponent_bids, round_state.bid_bounds()[1]))
         
         # Check/Fold if won enough chips to win game
         if self.enough_chips_to_win_game(game_state, active):
             return self.check_fold(legal_actions)
 
-        print(f'\tBoard: {" ".join(board_cards)}')
+        self.log.debug('\tBoard: %s', board_cards)
         
         if RaiseAction in legal_actions:
             min_raise, max_raise = round_state.raise_bounds()
         
-        strength = (self.strength_w_auction + self.strength_wo_auction)/2 if street < 3 else self.calculate_strength(round_state, active, self.MONTE_CARLO_ITERS)
+        if street < 3:
+            strength = (self.strength_w_auction + self.strength_wo_auction)/2
+        else:
+            thresholds = (continue_cost/(continue_cost + pot), self.PROB_THRESHOLD) if continue_cost > 0 else (self.PROB_THRESHOLD,)
+            iters = self.budget(game_state, spot_weight(pot, self.strength, thresholds))
+            strength = self.calculate_strength(round_state, active, iters, thresholds)
+        self.strength = strength
         raise_cost = min(int(continue_cost + strength*max(pot, 20)), my_stack)
-        print(f'\t\t{street}: {strength}')
+        self.log.debug('\t\t%d: %s', street, strength)
 
         if RaiseAction in legal_actions:
             raise_ammt = my_pip + raise_cost
@@ -171,7 +281,7 @@ class Player(Bot):
     HELPER FUNCTIONS
     """
 
-    def calculate_strength(self, round_state, active, iters):
+    def calculate_strength(self, round_state, active, iters, thresholds=()):
         '''
         Calcualte win probabilities with and without winning auction if before auction, 
         or win probability after auction.
@@ -179,7 +289,9 @@ class Player(Bot):
         Arguments:
         round_state: the RoundState object.
         active: your player's index.
-        iters: number of iterations the simulation is ran.
+        iters: the most iterations the simulation may run.
+        thresholds: equities the result is compared against; sampling after the auction stops
+            early once the estimate is confidently on one side of all of them.
 
         Returns:
         Win probability/probabilities.
@@ -190,86 +302,182 @@ class Player(Bot):
         board_cards = round_state.deck[:street]  # the board cards
         after_auction = not (street == 0 or street == 3 and BidAction in legal_actions)
 
-        deck = eval7.Deck()
-        my_cards = [eval7.Card(card) for card in my_cards]
-        for card in my_cards:
-            deck.cards.remove(card)
-        
+        start_time = time.perf_counter()
         if after_auction:
-            my_bid = round_state.bids[active]  # How much you bid previously (available only after auction)
-            opp_bid = round_state.bids[1-active]  # How much opponent bid previously (available only after auction)
-            won_bid = my_bid > opp_bid
-            board_cards = [eval7.Card(card) for card in board_cards]
-            for card in board_cards:
-                deck.cards.remove(card)
-            
-            wins = 0
-            for _ in range(iters):
-                deck.shuffle()
-                opp = 2 if won_bid else 3
-                community_left = 5 - street
-                draw = deck.peek(opp+community_left)
-                opp_cards = draw[:opp]
-                community_cards = draw[opp:] + board_cards
-
-                our_hand = my_cards + community_cards
-                opp_hand = opp_cards + community_cards
-
-                our_hand_val = eval7.evaluate(our_hand)
-                opp_hand_val = eval7.evaluate(opp_hand)
-
-                if our_hand_val > opp_hand_val:
-                    wins += 2
-                elif our_hand_val == opp_hand_val:
-                    wins += 1
-                
-            return wins / (2*iters)
-        
-        wins_wo_auction = 0
-        for _ in range(iters):
-            deck.shuffle()
-            opp = 3
-            community = 5
-            draw = deck.peek(opp+community)
-            opp_cards = draw[:opp]
-            community_cards = draw[opp:]
-
-            our_hand = my_cards + community_cards
-            opp_hand = opp_cards + community_cards
-
-            our_hand_val = eval7.evaluate(our_hand)
-            opp_hand_val = eval7.evaluate(opp_hand)
-
-            if our_hand_val > opp_hand_val:
-                wins_wo_auction += 2
-            elif our_hand_val == opp_hand_val:
-                wins_wo_auction += 1
-
-        wins_w_auction = 0
-        for _ in range(iters):
-            deck.shuffle()
-            opp = 2
-            community = 5
-            auction = 1
-            draw = deck.peek(opp+community+auction)
-            opp_cards = draw[:opp]
-            community_cards = draw[opp: opp + community]
-            auction_card = draw[opp+community:]
-            our_hand = my_cards + auction_card + community_cards
-            opp_hand = opp_cards + community_cards
-
-            our_hand_val = eval7.evaluate(our_hand)
-            opp_hand_val = eval7.evaluate(opp_hand)
-
-            if our_hand_val > opp_hand_val:
-                wins_w_auction += 2
-            elif our_hand_val == opp_hand_val:
-                wins_w_auction += 1
-            
-            strength_w_auction = wins_w_auction / (2*iters)
-            strength_wo_auction = wins_wo_auction/ (2*iters)
-
-        return strength_w_auction, strength_wo_auction
+            situation = self.situation(round_state, active)
+            if street == 3 and situation[2] == 3 and len(my_cards) == 2 and self.flop_table is not None:
+                # we lost the auction, which is the table's without-auction column
+                return self.flop_table.strengths(my_cards, board_cards)[1]
+            self.load_stored(situation)
+            strength = self.exact_strengths.get(situation)
+            if strength is not None:
+                return strength
+            evals = self.exact_evals(situation)
+            if evals <= self.EXACT_EVALS_PER_ITER * iters:
+                # enumerating every opponent hand and runout is cheaper than sampling
+                strength = exact_equity(*situation)
+                self.clock.record(evals / self.EXACT_EVALS_PER_ITER, time.perf_counter() - start_time)
+                self.exact_strengths.put(situation, strength)
+                self.disk_cache.put(situation, strength)
+                return strength
+            result = self.simulations.get(situation)
+            if result is None:
+                # deals from earlier streets of this hand that agree with the new cards
+                result = self.hand_simulation(my_cards, situation[2]).prior(board_cards)
+            if result is None or (result.samples < iters and not settled(result, thresholds)):
+                prior_samples = result.samples if result else 0
+                result = self.simulate(my_cards, board_cards, situation[2], iters, thresholds, result)
+                self.clock.record(result.samples - prior_samples, time.perf_counter() - start_time)
+                self.simulations.put(situation, result)
+                self.disk_cache.put(situation, result)
+            return result.equity
+
+        # both outcomes are evaluated on the same deals, so their difference, which drives the bid, is far less noisy
+        value = auction_value(my_cards, board_cards, 0., min_samples=iters, chunk=min(iters, AUCTION_CHUNK), rng=self.rng)
+        self.clock.record(value.samples * self.ITERS_PER_AUCTION_SAMPLE, time.perf_counter() - start_time)
+        return value.win.equity, value.lose.equity
+
+    def auction_strengths(self, game_state, my_cards, board_cards, pot):
+        '''
+        Estimates our equity with and without the auction card on the actual flop.
+
+        Arguments:
+        game_state: the GameState object.
+        my_cards: our hole cards.
+        board_cards: the flop.
+        pot: the chips in the pot before the auction.
+
+        Returns:
+        (strength with the auction card, strength without it, strength when both get a card).
+        '''
+        if self.flop_table is not None:
+            strength_w_auction, strength_wo_auction = self.flop_table.strengths(my_cards, board_cards)
+            # the table has no tie column; three cards each sits between the two
+            return strength_w_auction, strength_wo_auction, (strength_w_auction + strength_wo_auction) / 2
+        iters = self.budget(game_state, spot_weight(pot))
+        seconds = iters * self.clock.iter_cost if self.clock.iter_cost is not None else 0.
+        start_time = time.perf_counter()
+        value = auction_value(my_cards, board_cards, seconds, rng=self.rng)
+        self.clock.record(value.samples * self.ITERS_PER_AUCTION_SAMPLE, time.perf_counter() - start_time)
+        self.log.debug('\t\tAuction: %.3f %.3f %.3f', value.win.equity, value.lose.equity, value.tie.equity)
+        return value.win.equity, value.lose.equity, value.tie.equity
+
+    def budget(self, game_state, weight=1.):
+        '''
+        Asks the clock budget how many simulations this decision may run.
+
+        Arguments:
+        game_state: the GameState object.
+        weight: the importance of the decision, see spot_weight.
+
+        Returns:
+        Number of iterations, at least 1.
+        '''
+        if self.clock.iter_cost is None:
+            return self.MONTE_CARLO_ITERS
+        return max(self.clock.iterations(game_state, weight), 1)
+
+    def situation(self, round_state, active):
+        '''
+        Describes the post-auction equity calculation for a round state.
+
+        Arguments:
+        round_state: the RoundState object.
+        active: your player's index.
+
+        Returns:
+        A canonical (my cards, board cards, opponent card count) tuple.
+        '''
+        street = round_state.street
+        my_bid = round_state.bids[active]  # How much you bid previously (available only after auction)
+        opp_bid = round_state.bids[1-active]  # How much opponent bid previously (available only after auction)
+        won_bid = my_bid > opp_bid
+        opp = 2 if won_bid else 3
+        return canonical_situation(round_state.hands[active], round_state.deck[:street], opp)
+
+    def load_stored(self, situation):
+        '''
+        Copies the disk cache's result for a situation into the in-memory caches, unless they already hold one.
+
+        Arguments:
+        situation: a canonical (my cards, board cards, opponent card count) tuple.
+
+        Returns:
+        Nothing.
+        '''
+        if situation in self.exact_strengths or situation in self.simulations:
+            return
+        stored = self.disk_cache.get(situation)
+        if stored is None:
+            return
+        if stored.samples == EXACT:
+            self.exact_strengths.put(situation, stored.equity)
+        else:
+            self.simulations.put(situation, stored)
+
+    def exact_evals(self, situation):
+        '''
+        Counts the hand evaluations needed to enumerate a post-auction situation exactly.
+
+        Arguments:
+        situation: a (my cards, board cards, opponent card count) tuple.
+
+        Returns:
+        Number of evaluations.
+        '''
+        my_cards, board_cards, opp = situation
+        return exact_cost(52, len(my_cards), len(board_cards), opp)
+
+    def hand_simulation(self, my_cards, opp):
+        '''
+        Returns the HandSimulation for our current hand, starting a new one if our cards or the auction outcome changed.
+
+        Arguments:
+        my_cards: our hole cards.
+        opp: the number of opponent hole cards.
+
+        Returns:
+        A HandSimulation.
+        '''
+        if self.hand is None or self.hand.my_cards != tuple(my_cards) or self.hand.opp != opp:
+            self.hand = HandSimulation(my_cards, opp)
+        return self.hand
+
+    def simulate(self, my_cards, board_cards, opp, iters, thresholds=(), prior=None, parallel=True):
+        '''
+        Plays out random opponent hands and runouts for a post-auction situation.
+        Without the worker pool the deals are kept in the hand simulation for later streets.
+        On the turn, once the budget covers every opponent holding STRATIFY_RUNOUTS times, what a
+        first chunk does not settle is estimated with stratified_equity instead, which measured
+        1-2x as efficient per second there but only about even on the flop.
+
+        Arguments:
+        my_cards: our hole cards.
+        board_cards: the board cards.
+        opp: the number of opponent hole cards.
+        iters: the most iterations the estimate may hold, including the prior ones.
+        thresholds: equities that stop the simulation early once the estimate clears them.
+        prior: an earlier Equity for the same situation to continue from.
+        parallel: whether the worker pool may be used, if there is one.
+
+        Returns:
+        An Equity tuple.
+        '''
+        if self.pool is None or not parallel:
+            sampler = self.hand_simulation(my_cards, opp).sample_outcomes
+            probe_samples = prior.samples if prior is not None else ADAPTIVE_CHUNK
+            holdings = math.comb(52 - len(my_cards) - len(board_cards), opp)
+            if len(board_cards) == 4 and iters - probe_samples >= self.STRATIFY_RUNOUTS * holdings:
+                # a clear spot still stops after the first chunk
+                probe = prior if prior is not None else adaptive_equity(my_cards, board_cards, probe_samples, thresholds, 0, opp,
+                                                                        rng=self.rng, sampler=sampler)
+                if settled(probe, thresholds):
+                    return probe
+                return pool_equities(probe, stratified_equity(my_cards, board_cards, iters - probe.samples, opp,
+                                                              self.STRATIFY_RUNOUTS, self.rng))
+            return adaptive_equity(my_cards, board_cards, iters, thresholds, 0, opp, prior, rng=self.rng, sampler=sampler)
+        return adaptive_equity(my_cards, board_cards, iters, thresholds, 0, opp, prior, chunk=ADAPTIVE_CHUNK * self.pool.size,
+                               rng=self.rng, sampler=self.pool.sample_outcomes)
 
     def enough_chips_to_win_game(self, game_state, active):
         '''
@@ -0,0 +1,10 @@
+'''
+The skeleton a bot is built on. The rules it shares with the engine live in the
+top-level rules package of the repository, which is put on the path here.
+'''
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
@@ -1,11 +1,4 @@
 '''
-The actions that the player is allowed to take.
+The actions that the player is allowed to take, shared with the engine.
 '''
-from collections import namedtuple
-
-FoldAction = namedtuple('FoldAction', [])
-CallAction = namedtuple('CallAction', [])
-CheckAction = namedtuple('CheckAction', [])
-# we coalesce BetAction and RaiseAction for convenience
-RaiseAction = namedtuple('RaiseAction', ['amount'])
-BidAction = namedtuple('BidAction', ['amount'])
\ No newline at end of file
+from rules.actions import FoldAction, CallAction, CheckAction, RaiseAction, BidAction
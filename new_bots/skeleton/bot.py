@@ -36,6 +36,24 @@ class Bot():
         '''
         raise NotImplementedError('handle_round_over')
 
+    def ponder(self, game_state, round_state, active, cancelled):
+        '''
+        Optional. Called in a background thread after your bot sends an action,
+        while the engine waits on the opponent. Results should go into a cache
+        that get_action reads. Return promptly once cancelled is set, which
+        happens as soon as the engine's next message arrives.
+
+        Arguments:
+        game_state: the GameState object.
+        round_state: the RoundState object your bot just acted in.
+        active: your player's index.
+        cancelled: a threading.Event that is set when pondering must stop.
+
+        Returns:
+        Nothing.
+        '''
+        pass
+
     def get_action(self, game_state, round_state, active):
         '''
         Where the magic happens - your code should implement this function.
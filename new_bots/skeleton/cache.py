@@ -0,0 +1,97 @@
+'''
+Caching of equity results across decisions and rounds.
+
+Equity does not change when the suits are relabelled consistently, so
+situations are keyed by a canonical form: suits are renamed in the order of
+the ranks they hold in our hand and on the board. Suits holding the same
+ranks are interchangeable, so their relative order does not matter.
+'''
+from collections import OrderedDict
+
+SUITS = 'cdhs'
+
+
+def canonical_suits(my_cards, board_cards):
+    '''
+    Returns the suit relabelling, as a dict, that takes a situation to its canonical form.
+    '''
+    signatures = {suit: ([], []) for suit in SUITS}
+    for card in my_cards:
+        signatures[card[1]][0].append(card[0])
+    for card in board_cards:
+        signatures[card[1]][1].append(card[0])
+    for my_ranks, board_ranks in signatures.values():
+        my_ranks.sort()
+        board_ranks.sort()
+    order = sorted(SUITS, key=signatures.__getitem__, reverse=True)
+    return dict(zip(order, SUITS))
+
+
+def canonical_situation(my_cards, board_cards, opp):
+    '''
+    Returns the canonical form of an equity calculation.
+    The result is itself a valid situation with the same equity.
+
+    Arguments:
+    my_cards: our hole cards in common format.
+    board_cards: the board cards in common format.
+    opp: the number of opponent hole cards, which encodes the auction outcome.
+
+    Returns:
+    A (my cards, board cards, opp) tuple of sorted card tuples.
+    '''
+    suits = canonical_suits(my_cards, board_cards)
+    return (tuple(sorted(card[0] + suits[card[1]] for card in my_cards)),
+            tuple(sorted(card[0] + suits[card[1]] for card in board_cards)),
+            opp)
+
+
+class EquityCache():
+    '''
+    A bounded mapping that evicts the least recently used entry and counts hits and misses.
+    '''
+
+    def __init__(self, capacity=100000):
+        '''
+        Arguments:
+        capacity: the maximum number of entries kept.
+        '''
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        '''
+        Returns the value stored for key and marks it as recently used, or default.
+        '''
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        '''
+        Stores value for key, evicting the least recently used entry when full.
+        '''
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def hit_rate(self):
+        '''
+        Returns the fraction of lookups that found an entry.
+        '''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
@@ -0,0 +1,80 @@
+'''
+Integer card representation.
+
+A card is an integer 0-51 with rank = card % 13 and suit = card // 13, the bit
+order eval7 uses for its card masks, and a set of cards is a 52-bit mask.
+The runner hands bots Cards tuples, which keep the usual strings and carry
+their integer and mask forms, so equity code never has to parse strings.
+'''
+import numpy as np
+import eval7
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+FULL_MASK = (1 << 52) - 1
+
+CARD_STRINGS = [RANKS[card % 13] + SUITS[card // 13] for card in range(52)]
+CARD_INDEX = {string: card for card, string in enumerate(CARD_STRINGS)}
+EVAL7_CARDS = [eval7.Card(string) for string in CARD_STRINGS]
+CARD_BITS = np.arange(52, dtype=np.uint64)
+
+
+class Cards(tuple):
+    '''
+    A tuple of cards in common format that also carries them as integers (ints) and as a mask.
+    Slices are Cards as well; concatenation gives a list.
+    '''
+
+    def __new__(cls, cards, ints=None):
+        self = super().__new__(cls, cards)
+        self.ints = tuple(CARD_INDEX[card] for card in self) if ints is None else ints
+        self.mask = cards_mask(self.ints)
+        return self
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Cards(tuple.__getitem__(self, index), self.ints[index])
+        return tuple.__getitem__(self, index)
+
+    def __add__(self, other):
+        # hands used to be lists, so concatenating with a list keeps working
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __getnewargs__(self):
+        return (tuple(self), self.ints)
+
+
+def card_indices(cards):
+    '''
+    Returns cards, given as Cards or in common format, as a list of integers.
+    '''
+    if isinstance(cards, Cards):
+        return list(cards.ints)
+    return [CARD_INDEX[card] for card in cards]
+
+
+def cards_mask(ints):
+    '''
+    Returns the mask of an iterable of integer cards.
+    '''
+    mask = 0
+    for card in ints:
+        mask |= 1 << card
+    return mask
+
+
+def mask_ints(mask):
+    '''
+    Returns the integer cards in a mask, in ascending order.
+    '''
+    return np.flatnonzero((np.uint64(mask) >> CARD_BITS) & np.uint64(1))
+
+
+def deck_ints(known_mask):
+    '''
+    Returns the integer cards that are not in known_mask, in ascending order.
+    '''
+    return mask_ints(FULL_MASK & ~known_mask)
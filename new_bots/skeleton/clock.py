@@ -0,0 +1,112 @@
+'''
+Spreads the game clock over the remaining decisions of the game.
+'''
+from .states import NUM_ROUNDS, STARTING_STACK
+
+
+class ClockBudget():
+    '''
+    Hands each decision an iteration budget from the remaining game clock, the remaining
+    rounds and the measured cost of one iteration.
+
+    Decisions that spend less than their budget (cache hits, table lookups, enumeration,
+    early stops) are paced by the seconds actually spent rather than by how many
+    budgets were asked for, so the time they leave flows to the decisions that use it.
+    '''
+
+    def __init__(self, reserve=1.5, min_iters=20, max_iters=200000, max_share=0.05, smoothing=0.1):
+        '''
+        Arguments:
+        reserve: seconds of game clock that are never handed out.
+        min_iters: the smallest budget returned while any clock is left to spend.
+        max_iters: the largest budget returned for one decision.
+        max_share: the largest share of the spendable clock one decision may get.
+        smoothing: weight of the newest measurement in the running per-iteration cost.
+        '''
+        self.reserve = reserve
+        self.min_iters = min_iters
+        self.max_iters = max_iters
+        self.max_share = max_share
+        self.smoothing = smoothing
+        self.iter_cost = None  # seconds per iteration
+        self.rounds = 0
+        self.budgets = 0
+        self.allowed = 0.  # seconds handed out in budgets once the iteration cost is known
+        self.spent = 0.  # seconds recorded while spending them
+
+    def new_round(self):
+        '''
+        Called once per round, so the seconds spent per round can be tracked.
+        '''
+        self.rounds += 1
+
+    def record(self, iters, elapsed):
+        '''
+        Updates the running per-iteration cost with a measured simulation.
+
+        Arguments:
+        iters: the number of iterations that were run.
+        elapsed: the seconds they took.
+        '''
+        self.spent += elapsed
+        if iters <= 0:
+            return
+        cost = elapsed / iters
+        if self.iter_cost is None:
+            self.iter_cost = cost
+        else:
+            self.iter_cost += self.smoothing * (cost - self.iter_cost)
+
+    def full_budgets_per_round(self):
+        '''
+        Returns the seconds spent per round so far, in units of the average budget handed out,
+        that is the number of decisions per round that would spend a whole budget.
+        '''
+        if self.rounds == 0 or self.allowed == 0.:
+            return 4.
+        average_budget = self.allowed / self.budgets
+        return max(self.spent / self.rounds / average_budget, 0.25)
+
+    def iterations(self, game_state, weight=1.):
+        '''
+        Returns the iteration budget for one decision.
+
+        Arguments:
+        game_state: the GameState object.
+        weight: how much this decision matters relative to an average one, see spot_weight.
+
+        Returns:
+        The number of iterations to run.
+        '''
+        spendable = game_state.game_clock - self.reserve
+        if spendable <= 0.:
+            return 0
+        if self.iter_cost is None:
+            return self.min_iters
+        remaining_rounds = max(NUM_ROUNDS - game_state.round_num, 0) + 1
+        seconds = spendable / (remaining_rounds * self.full_budgets_per_round()) * weight
+        seconds = min(seconds, spendable * self.max_share)
+        iters = min(max(int(seconds / self.iter_cost), self.min_iters), self.max_iters)
+        self.allowed += iters * self.iter_cost
+        self.budgets += 1
+        return iters
+
+
+def spot_weight(pot, strength=None, thresholds=(), margin=0.1):
+    '''
+    Weighs a decision by its pot size and by how close the last equity estimate is to the thresholds it is compared against.
+
+    Arguments:
+    pot: the number of chips in the pot.
+    strength: the latest equity estimate, or None if there is none yet.
+    thresholds: the equities that separate different actions.
+    margin: distances below this count as a close decision.
+
+    Returns:
+    A weight around 1 for an average decision.
+    '''
+    weight = 0.5 + 2. * pot / STARTING_STACK
+    if strength is not None and thresholds:
+        distance = min(abs(strength - threshold) for threshold in thresholds)
+        weight *= 1. + max(margin - distance, 0.) / margin
+    return weight
@@ -0,0 +1,312 @@
+'''
+An equity cache on disk that outlives games and is shared by bot processes.
+
+Records are 24 bytes: a key packing a canonical situation, win and tie rates,
+the standard error and the sample count, 0 for an exact result. The file
+starts with a block of records sorted by key, written by compaction and
+searched in place through a read-only memory map, followed by an append-only
+tail. Writers append whole batches with O_APPEND under a shared lock.
+Compaction takes the lock exclusively, merges the file into a new sorted
+block, evicts down to the size cap and replaces the file, which readers
+notice by its inode. It runs when a cache is opened or by the warm-up tool,
+never from flush, so it stays off the game clock. Warm it up offline with
+
+python3 -m skeleton.disk_cache [--seconds S] [--samples N]
+
+from a bot directory.
+'''
+import argparse
+import fcntl
+import mmap
+import os
+import time
+import numpy as np
+from .cache import canonical_situation
+from .cards import CARD_INDEX, CARD_STRINGS
+from .equity import Equity, batch_equity, exact_cost, exact_equity
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'equity_cache.bin')
+MAGIC = b'EQC1'
+HEADER = np.dtype([('magic', 'S4'), ('record_size', '<u4'), ('sorted_records', '<u8')])
+RECORD = np.dtype([('key', '<u8'), ('win', '<f4'), ('tie', '<f4'), ('std_error', '<f4'), ('samples', '<i4')])
+EXACT = 0  # the sample count stored for an enumerated result
+MAX_RECORDS = 1 << 20
+EMPTY_SLOT = 63
+
+
+def situation_key(situation):
+    '''
+    Packs a canonical (my cards, board cards, opp) situation into an integer.
+    The board size sits in the top bits, so keys sort by street.
+    '''
+    my_cards, board_cards, opp = situation
+    slots = [CARD_INDEX[card] for card in my_cards] + [EMPTY_SLOT] * (3 - len(my_cards))
+    slots += [CARD_INDEX[card] for card in board_cards] + [EMPTY_SLOT] * (5 - len(board_cards))
+    key = len(board_cards) << 60 | opp << 56
+    for position, card in enumerate(slots):
+        key |= card << 6 * position
+    return key
+
+
+def key_situation(key):
+    '''
+    Unpacks a situation_key.
+    '''
+    slots = [key >> 6 * position & EMPTY_SLOT for position in range(8)]
+    return (tuple(CARD_STRINGS[card] for card in slots[:3] if card != EMPTY_SLOT),
+            tuple(CARD_STRINGS[card] for card in slots[3:] if card != EMPTY_SLOT),
+            key >> 56 & 15)
+
+
+def better(samples, other_samples):
+    '''
+    Returns whether a record with samples beats one with other_samples: exact beats any estimate, then more samples win.
+    '''
+    if other_samples == EXACT:
+        return False
+    return samples == EXACT or samples > other_samples
+
+
+class DiskCache():
+    '''
+    A shared, size-capped equity cache backed by one file.
+    Lookups read the memory map; puts are buffered and written by flush.
+    '''
+
+    def __init__(self, path=CACHE_PATH, max_records=MAX_RECORDS):
+        '''
+        Arguments:
+        path: the cache file, created on the first flush.
+        max_records: the size cap; opening a file past it compacts and evicts, and flush
+            stops appending once the tail would take the file a quarter past it.
+        '''
+        self.path = path
+        self.max_records = max_records
+        self.pending = {}  # key -> record tuple, written by flush
+        self.inode = None
+        self.size = 0
+        self.records = np.zeros(0, dtype=RECORD)
+        self.sorted_keys = self.records['key']
+        self.tail = {}  # key -> row of the best record in the unsorted tail
+        self.hits = 0
+        self.misses = 0
+        self.refresh()
+        if len(self.records) > self.max_records:
+            self.compact()
+            self.refresh()
+
+    def refresh(self):
+        '''
+        Maps records appended since the last call, and the whole file again after a compaction replaced it.
+        '''
+        try:
+            file = open(self.path, 'rb')
+        except OSError:
+            return
+        with file:
+            # the open file, not the path, decides: a compaction may replace the path at any moment
+            stat = os.fstat(file.fileno())
+            if stat.st_ino == self.inode and stat.st_size == self.size:
+                return
+            if stat.st_size < HEADER.itemsize:
+                return
+            header = np.frombuffer(file.read(HEADER.itemsize), dtype=HEADER)[0]
+            if header['magic'] != MAGIC or header['record_size'] != RECORD.itemsize:
+                return
+            count = (stat.st_size - HEADER.itemsize) // RECORD.itemsize  # a batch still being appended is left out
+            # the old mapping stays valid until the arrays viewing it are dropped
+            mapping = mmap.mmap(file.fileno(), HEADER.itemsize + count * RECORD.itemsize, access=mmap.ACCESS_READ)
+        start = len(self.records)
+        if stat.st_ino != self.inode:
+            self.inode = stat.st_ino
+            self.tail = {}
+            start = int(header['sorted_records'])
+        self.size = stat.st_size
+        self.records = np.frombuffer(mapping, dtype=RECORD, count=count, offset=HEADER.itemsize)
+        self.sorted_keys = self.records['key'][:int(header['sorted_records'])]
+        samples = self.records['samples']
+        for row, key in enumerate(self.records['key'][start:].tolist(), start):
+            best = self.tail.get(key)
+            if best is None or better(samples[row], samples[best]):
+                self.tail[key] = row
+
+    def find(self, key):
+        '''
+        Returns the row of the best record for key in the mapped file, or None.
+        '''
+        row = self.tail.get(key)
+        index = np.searchsorted(self.sorted_keys, key)
+        if index < len(self.sorted_keys) and self.sorted_keys[index] == key:
+            if row is None or better(self.records['samples'][index], self.records['samples'][row]):
+                row = int(index)
+        return row
+
+    def get(self, situation):
+        '''
+        Looks up a canonical situation.
+
+        Arguments:
+        situation: a canonical (my cards, board cards, opp) tuple.
+
+        Returns:
+        An Equity tuple, with samples EXACT for an enumerated result, or None.
+        '''
+        key = situation_key(situation)
+        row = self.find(key)
+        if row is None:
+            # another process may have added it since the last look
+            self.refresh()
+            row = self.find(key)
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        _, win, tie, std_error, samples = self.records[row].tolist()
+        return Equity(win + tie / 2, win, tie, std_error, samples)
+
+    def put(self, situation, result):
+        '''
+        Buffers a result for the next flush unless the file already holds one at least as good.
+
+        Arguments:
+        situation: a canonical (my cards, board cards, opp) tuple.
+        result: an Equity tuple, or a float strength from exact enumeration.
+        '''
+        if not isinstance(result, Equity):
+            result = Equity(result, result, 0., 0., EXACT)
+        key = situation_key(situation)
+        row = self.find(key)
+        if row is not None and not better(result.samples, self.records['samples'][row]):
+            return
+        self.pending[key] = (key, result.win, result.tie, result.std_error, result.samples)
+
+    def flush(self):
+        '''
+        Appends the buffered records in one write, or creates the file with them if it is missing.
+        Past the size cap the records are dropped; the next cache opened compacts the file.
+        '''
+        if not self.pending:
+            return
+        batch = np.array(list(self.pending.values()), dtype=RECORD).tobytes()
+        self.pending = {}
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            try:
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            except OSError:
+                fd = None
+            if fd is not None:
+                try:
+                    records = (os.fstat(fd).st_size - HEADER.itemsize) // RECORD.itemsize
+                    if records + len(batch) // RECORD.itemsize <= self.max_records + self.max_records // 4:
+                        os.write(fd, batch)
+                finally:
+                    os.close(fd)
+            fcntl.flock(lock, fcntl.LOCK_UN)
+        if fd is None:
+            # a new file holds only this batch, so creating it is cheap
+            self.compact(batch)
+        self.refresh()
+
+    def compact(self, extra=b''):
+        '''
+        Rewrites the file as one sorted block holding the best record per situation, creating it if missing.
+        Past the size cap, situations with more board cards are evicted first, since they recur least,
+        and estimates before exact results and smaller estimates before larger ones.
+
+        Arguments:
+        extra: bytes of records to merge in.
+        '''
+        with open(self.path + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.path, 'rb') as file:
+                    data = file.read()
+                valid = (len(data) >= HEADER.itemsize and
+                         np.frombuffer(data, dtype=HEADER, count=1)[0]['magic'] == MAGIC)
+            except OSError:
+                valid = False
+            records = np.zeros(0, dtype=RECORD)
+            if valid:
+                count = (len(data) - HEADER.itemsize) // RECORD.itemsize
+                records = np.frombuffer(data, dtype=RECORD, count=count, offset=HEADER.itemsize)
+            records = np.concatenate((records, np.frombuffer(extra, dtype=RECORD)))
+            # exact records rank above every estimate
+            rank = np.where(records['samples'] == EXACT, np.iinfo(np.int32).max, records['samples'])
+            # the best record per key comes first within its key, and the first of each key is kept
+            records = records[np.lexsort((-rank, records['key']))]
+            keep = np.ones(len(records), dtype=bool)
+            keep[1:] = records['key'][1:] != records['key'][:-1]
+            records = records[keep]
+            if len(records) > self.max_records:
+                # evict down to three quarters of the cap so compactions stay rare
+                rank = np.where(records['samples'] == EXACT, np.iinfo(np.int32).max, records['samples'])
+                survivors = np.lexsort((-rank, records['key'] >> np.uint64(60)))[:self.max_records * 3 // 4]
+                records = records[np.sort(survivors)]
+            header = np.array([(MAGIC, RECORD.itemsize, len(records))], dtype=HEADER)
+            with open(self.path + '.tmp', 'wb') as file:
+                file.write(header.tobytes())
+                file.write(records.tobytes())
+            os.replace(self.path + '.tmp', self.path)
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def __len__(self):
+        return len(self.records)
+
+    def hit_rate(self):
+        '''
+        Returns the fraction of lookups that found a record.
+        '''
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+
+def warm(cache, seconds, samples, rng=None):
+    '''
+    Fills the cache with the post-auction situations of random hands for a while, as a bot meets them:
+    the flop, turn and river after winning and after losing the auction.
+
+    Arguments:
+    cache: a DiskCache, flushed after every hand and compacted whenever it passes its size cap.
+    seconds: how long to run.
+    samples: the deals sampled per situation that is too large to enumerate.
+    rng: an optional numpy Generator.
+
+    Returns:
+    The number of situations computed.
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    deadline = time.perf_counter() + seconds
+    computed = 0
+    while time.perf_counter() < deadline:
+        cards = [CARD_STRINGS[card] for card in rng.choice(52, 8, replace=False)]
+        for my_cards, opp in ((cards[:2], 3), (cards[:3], 2)):
+            for street in (3, 4, 5):
+                situation = canonical_situation(my_cards, cards[3:3 + street], opp)
+                if cache.get(situation) is not None:
+                    continue
+                if exact_cost(52, len(my_cards), street, opp) <= 2 * samples:
+                    cache.put(situation, exact_equity(*situation))
+                else:
+                    cache.put(situation, batch_equity(*situation[:2], samples, 0, opp, rng))
+                computed += 1
+        cache.flush()
+        if len(cache) > cache.max_records:
+            # offline, so the compaction that bots never run during a game happens here
+            cache.compact()
+            cache.refresh()
+    return computed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python3 -m skeleton.disk_cache')
+    parser.add_argument('--seconds', type=float, default=60., help='How long to warm the cache, defaults to 60')
+    parser.add_argument('--samples', type=int, default=5000, help='Samples per situation, defaults to 5000')
+    parser.add_argument('--path', default=CACHE_PATH, help='The cache file, defaults to the skeleton one')
+    args = parser.parse_args()
+    for situation in (canonical_situation(('Ad', 'Kd'), (), 3), canonical_situation(('2c', '7h', 'As'), ('Qd', 'Jd', '3s', '4h', '9c'), 2)):
+        assert key_situation(situation_key(situation)) == situation
+    cache = DiskCache(args.path)
+    computed = warm(cache, args.seconds, args.samples)
+    print('computed {} situations, the cache holds {} records'.format(computed, len(cache)))
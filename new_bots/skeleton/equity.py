@@ -0,0 +1,281 @@
+'''
+Equity calculations for the auction variant.
+'''
+from collections import namedtuple
+from itertools import combinations
+from math import comb, sqrt
+import numpy as np
+import eval7
+from . import evaluator
+from .cards import EVAL7_CARDS, card_indices, cards_mask, deck_ints
+from .sampler import draw_batch
+
+# win and tie are rates, std_error is the standard error of equity
+Equity = namedtuple('Equity', ['equity', 'win', 'tie', 'std_error', 'samples'])
+
+# (our extra cards, opponent hole cards) for each auction outcome
+AUCTION_OUTCOMES = {'win': (1, 2), 'lose': (0, 3), 'tie': (1, 3)}
+
+ADAPTIVE_CHUNK = 256
+ADAPTIVE_MIN_SAMPLES = 128
+ADAPTIVE_Z = 2.58  # about 99% two-sided, since the interval is checked after every chunk
+
+
+def exact_cost(num_cards, my_cards, board_cards, opp):
+    '''
+    Returns the number of hand evaluations exact_equity needs.
+
+    Arguments:
+    num_cards: the number of cards in play, 52.
+    my_cards: the number of our hole cards.
+    board_cards: the number of board cards dealt so far.
+    opp: the number of opponent hole cards.
+    '''
+    unknown = num_cards - my_cards - board_cards
+    community_left = 5 - board_cards
+    return comb(unknown, community_left) * (1 + comb(unknown - community_left, opp))
+
+
+def exact_equity(my_cards, board_cards, opp, cancelled=None):
+    '''
+    Enumerates every remaining runout and opponent hand.
+
+    Arguments:
+    my_cards: our hole cards in common format.
+    board_cards: the board cards in common format.
+    opp: the number of opponent hole cards.
+    cancelled: an optional threading.Event that aborts the enumeration.
+
+    Returns:
+    Our equity, counting ties as half, or None if cancelled.
+    '''
+    my_ints = card_indices(my_cards)
+    board_ints = card_indices(board_cards)
+    my_cards = [EVAL7_CARDS[card] for card in my_ints]
+    board_cards = [EVAL7_CARDS[card] for card in board_ints]
+    deck = [EVAL7_CARDS[card] for card in deck_ints(cards_mask(my_ints + board_ints))]
+    evaluate = eval7.evaluate
+    wins = 0
+    total = 0
+    for runout in combinations(deck, 5 - len(board_cards)):
+        community_cards = list(runout) + board_cards
+        our_hand_val = evaluate(my_cards + community_cards)
+        remaining = [card for card in deck if card not in runout]
+        for opp_cards in combinations(remaining, opp):
+            if cancelled is not None and total % 1024 == 0 and cancelled.is_set():
+                return None
+            opp_hand_val = evaluate(list(opp_cards) + community_cards)
+            if our_hand_val > opp_hand_val:
+                wins += 2
+            elif our_hand_val == opp_hand_val:
+                wins += 1
+            total += 1
+    return wins / (2*total)
+
+
+def deal_arrays(my_cards, board_cards):
+    '''
+    Converts known cards, as Cards or in common format, to evaluator integer arrays.
+
+    Returns:
+    (our cards, board cards, the remaining deck) as int64 arrays.
+    '''
+    my_ints = card_indices(my_cards)
+    board_ints = card_indices(board_cards)
+    deck = deck_ints(cards_mask(my_ints + board_ints))
+    return np.array(my_ints, dtype=np.int64), np.array(board_ints, dtype=np.int64), deck
+
+
+def sample_deals(my_cards, board_cards, deck, samples, my_extra, opp, rng):
+    '''
+    Deals and evaluates a batch of random completions of the known cards.
+
+    Arguments:
+    my_cards, board_cards, deck: int64 arrays from deal_arrays.
+    samples: the number of deals.
+    my_extra: unknown hole cards we are still to receive.
+    opp: the number of opponent hole cards.
+    rng: a numpy Generator.
+
+    Returns:
+    (community cards, opponent cards, our hand values, opponent hand values), one row per deal.
+    '''
+    community_left = 5 - len(board_cards)
+    draw_size = my_extra + opp + community_left
+    draw = draw_batch(deck, samples, draw_size, rng)
+    community = np.concatenate((np.broadcast_to(board_cards, (samples, len(board_cards))), draw[:, :community_left]), axis=1)
+    ours = np.concatenate((np.broadcast_to(my_cards, (samples, len(my_cards))), draw[:, community_left:community_left + my_extra], community), axis=1)
+    opp_cards = draw[:, community_left + my_extra:]
+    theirs = np.concatenate((opp_cards, community), axis=1)
+    return community, opp_cards, evaluator.evaluate(ours), evaluator.evaluate(theirs)
+
+
+def sample_outcomes(my_cards, board_cards, deck, samples, my_extra, opp, rng):
+    '''
+    Same as sample_deals, but only returns the (wins, ties) counts.
+    '''
+    _, _, our_values, opp_values = sample_deals(my_cards, board_cards, deck, samples, my_extra, opp, rng)
+    return int(np.count_nonzero(our_values > opp_values)), int(np.count_nonzero(our_values == opp_values))
+
+
+def card_masks(cards):
+    '''
+    Returns each row of an integer card array as a 64-bit card mask.
+    '''
+    return (np.uint64(1) << cards.astype(np.uint64)).sum(axis=1, dtype=np.uint64)
+
+
+class HandSimulation():
+    '''
+    Keeps the deals sampled during one hand after the auction, so that later streets
+    can reuse the ones consistent with the cards revealed since.
+    A deal drawn on an earlier street is a valid sample for the current board if its
+    runout contains every revealed card and the opponent holds none of them.
+    '''
+
+    def __init__(self, my_cards, opp, capacity=100000):
+        '''
+        Arguments:
+        my_cards: our hole cards in common format, fixed for the rest of the hand.
+        opp: the number of opponent hole cards.
+        capacity: the most deals kept; later deals are counted but not stored.
+        '''
+        self.my_cards = tuple(my_cards)
+        self.opp = opp
+        self.capacity = capacity
+        self.board_masks = np.zeros(0, dtype=np.uint64)
+        self.opp_masks = np.zeros(0, dtype=np.uint64)
+        self.outcomes = np.zeros(0, dtype=np.int8)  # 2 for a win, 1 for a tie, 0 for a loss
+
+    def prior(self, board_cards):
+        '''
+        Returns an Equity over the stored deals consistent with a board, or None if there are none.
+        '''
+        if not len(self.outcomes):
+            return None
+        board_mask = np.uint64(cards_mask(card_indices(board_cards)))
+        consistent = ((self.board_masks & board_mask) == board_mask) & ((self.opp_masks & board_mask) == 0)
+        outcomes = self.outcomes[consistent]
+        if not len(outcomes):
+            return None
+        return make_equity(int(np.count_nonzero(outcomes == 2)), int(np.count_nonzero(outcomes == 1)), len(outcomes))
+
+    def sample_outcomes(self, my_cards, board_cards, deck, samples, my_extra, opp, rng):
+        '''
+        Same as equity.sample_outcomes, and stores the deals for later streets.
+        '''
+        community, opp_cards, our_values, opp_values = sample_deals(my_cards, board_cards, deck, samples, my_extra, opp, rng)
+        wins = our_values > opp_values
+        ties = our_values == opp_values
+        room = self.capacity - len(self.outcomes)
+        if room > 0:
+            self.board_masks = np.concatenate((self.board_masks, card_masks(community[:room])))
+            self.opp_masks = np.concatenate((self.opp_masks, card_masks(opp_cards[:room])))
+            self.outcomes = np.concatenate((self.outcomes, (2*wins + ties)[:room].astype(np.int8)))
+        return int(np.count_nonzero(wins)), int(np.count_nonzero(ties))
+
+
+def batch_equity(my_cards, board_cards, samples, my_extra=0, opp=2, rng=None):
+    '''
+    Samples many deals at once and evaluates them with the vectorized evaluator.
+
+    Arguments:
+    my_cards: our known hole cards in common format.
+    board_cards: the board cards in common format.
+    samples: the number of deals to sample.
+    my_extra: unknown hole cards we are still to receive, 1 for an auction card we win or tie.
+    opp: the number of opponent hole cards, 3 if the opponent wins or ties the auction.
+    rng: an optional numpy Generator.
+
+    Returns:
+    An Equity tuple.
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    wins, ties = sample_outcomes(*deal_arrays(my_cards, board_cards), samples, my_extra, opp, rng)
+    return make_equity(wins, ties, samples)
+
+
+def settled(result, thresholds, z=ADAPTIVE_Z, min_samples=ADAPTIVE_MIN_SAMPLES):
+    '''
+    Returns True if the confidence interval of an Equity lies entirely on one side of every threshold.
+    Without thresholds or with fewer than min_samples samples nothing is settled.
+    '''
+    if not thresholds or result.samples < min_samples:
+        return False
+    margin = z * result.std_error
+    return all(abs(result.equity - threshold) > margin for threshold in thresholds)
+
+
+def adaptive_equity(my_cards, board_cards, max_samples, thresholds=(), my_extra=0, opp=2,
+                    prior=None, chunk=ADAPTIVE_CHUNK, min_samples=ADAPTIVE_MIN_SAMPLES, z=ADAPTIVE_Z, rng=None,
+                    sampler=sample_outcomes):
+    '''
+    Samples in chunks until the estimate is settled against the thresholds or max_samples is reached.
+
+    Arguments:
+    my_cards: our known hole cards in common format.
+    board_cards: the board cards in common format.
+    max_samples: the most samples the estimate may hold, including the prior ones.
+    thresholds: the equities the caller compares the result against, e.g. pot odds.
+    my_extra: unknown hole cards we are still to receive.
+    opp: the number of opponent hole cards.
+    prior: an optional Equity for the same situation to continue from.
+    chunk: the number of deals sampled between checks.
+    min_samples: no stopping before this many samples, as the error estimate is unreliable below it.
+    z: the half width of the confidence interval in standard errors.
+    rng: an optional numpy Generator.
+    sampler: draws each chunk, e.g. EquityPool.sample_outcomes to spread it over processes.
+
+    Returns:
+    An Equity tuple over the prior and the new samples.
+    '''
+    if rng is None:
+        rng = np.random.default_rng()
+    wins = ties = samples = 0
+    if prior is not None:
+        samples = prior.samples
+        wins = round(prior.win * samples)
+        ties = round(prior.tie * samples)
+    result = prior
+    arrays = deal_arrays(my_cards, board_cards)
+    while samples < max_samples:
+        if result is not None and settled(result, thresholds, z, min_samples):
+            break
+        size = min(chunk, max_samples - samples)
+        new_wins, new_ties = sampler(*arrays, size, my_extra, opp, rng)
+        wins += new_wins
+        ties += new_ties
+        samples += size
+        result = make_equity(wins, ties, samples)
+    return result
+
+
+def make_equity(wins, ties, samples):
+    '''
+    Builds an Equity tuple from win and tie counts, scoring a win 1 and a tie 1/2.
+    '''
+    win = wins / samples
+    tie = ties / samples
+    equity = win + tie / 2
+    variance = max(win + tie / 4 - equity * equity, 0.)
+    return Equity(equity, win, tie, sqrt(variance / samples), samples)
+
+
+def pool_equities(first, second):
+    '''
+    Combines two independent estimates of the same equity, weighting each by its samples.
+    '''
+    samples = first.samples + second.samples
+    share = first.samples / samples
+    equity, win, tie = (share * a + (1 - share) * b for a, b in zip(first[:3], second[:3]))
+    std_error = sqrt((share * first.std_error) ** 2 + ((1 - share) * second.std_error) ** 2)
+    return Equity(equity, win, tie, std_error, samples)
+
+
+def auction_equities(my_cards, board_cards, samples, rng=None):
+    '''
+    Returns the Equity for each auction outcome ('win', 'lose', 'tie') before the auction card is dealt.
+    '''
+    return {outcome: batch_equity(my_cards, board_cards, samples, my_extra, opp, rng)
+            for outcome, (my_extra, opp) in AUCTION_OUTCOMES.items()}
@@ -0,0 +1,134 @@
+'''
+Precomputed flop equities for every canonical flop and pair of hole cards.
+
+Up to suit relabelling there are 1755 distinct flops. For each of them the
+table stores, for all 1326 two-card holdings in that flop's canonical suits,
+the probability of beating a random opponent when we win the auction (3 cards
+against 2) and when we lose it (2 cards against 3), as uint16 fractions of
+65535. Holdings that share a card with the flop are left at 0. Both columns
+come from the same deals, as in auction.auction_value, so their difference,
+which sets the bid, is no noisier than the live estimate the table replaces.
+
+The table is about 9 MB, so it is not checked in. Generate it offline with
+
+python3 -m skeleton.flop [--samples N] [--processes P]
+
+from a bot directory. Bots map it as a shared table, so only the pages they touch are read.
+'''
+from itertools import combinations
+from multiprocessing import Pool
+import argparse
+import os
+import numpy as np
+from .auction import auction_value
+from .cache import canonical_suits
+from .ranges import RANGE_SIZES, combo_index
+from .tables import map_table, shared_table, table_path, temporary_path
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+NUM_FLOPS = 1755
+NUM_HOLDINGS = RANGE_SIZES[2]
+SCALE = 65535
+# a bot's live paired estimate at bid time draws about 6,000-9,000 deals
+DEFAULT_SAMPLES = 10000
+TABLE_NAME = 'flop_equity'
+TABLE_SHAPE = (NUM_FLOPS, NUM_HOLDINGS, 2)
+
+
+def canonical_flop(board_cards):
+    '''
+    Returns the canonical form of a flop and the suit relabelling that produces it.
+    '''
+    suits = canonical_suits((), board_cards)
+    return tuple(sorted(card[0] + suits[card[1]] for card in board_cards)), suits
+
+
+def canonical_flops():
+    '''
+    Returns the 1755 canonical flops in table order.
+    '''
+    deck = [rank + suit for rank in RANKS for suit in SUITS]
+    return sorted({canonical_flop(flop)[0] for flop in combinations(deck, 3)})
+
+
+class FlopTable():
+    '''
+    A mapped flop equity table.
+    '''
+
+    def __init__(self, values):
+        '''
+        Arguments:
+        values: the mapped table, see load_table.
+        '''
+        self.values = values
+        flops = shared_table('canonical_flops', lambda: np.array(canonical_flops()))
+        self.flop_index = {tuple(flop): index for index, flop in enumerate(flops.tolist())}
+
+    def strengths(self, my_cards, board_cards):
+        '''
+        Looks up our equity on a flop.
+
+        Arguments:
+        my_cards: our two hole cards in common format.
+        board_cards: the three flop cards in common format.
+
+        Returns:
+        (strength with the auction card, strength without it).
+        '''
+        flop, suits = canonical_flop(board_cards)
+        holding = combo_index([card[0] + suits[card[1]] for card in my_cards])
+        strength_w_auction, strength_wo_auction = self.values[self.flop_index[flop], holding]
+        return int(strength_w_auction) / SCALE, int(strength_wo_auction) / SCALE
+
+
+def load_table(name=TABLE_NAME):
+    '''
+    Maps the table, or returns None if it has not been generated.
+    '''
+    values = map_table(name)
+    if values is None or values.shape != TABLE_SHAPE or values.dtype != np.uint16:
+        return None
+    return FlopTable(values)
+
+
+def flop_equities(job):
+    '''
+    Simulates every holding on one flop with and without the auction card, on shared deals.
+    '''
+    index, flop, samples, seed = job
+    rng = np.random.default_rng(seed)
+    values = np.zeros((NUM_HOLDINGS, 2), dtype=np.uint16)
+    deck = [rank + suit for rank in RANKS for suit in SUITS if rank + suit not in flop]
+    for my_cards in combinations(deck, 2):
+        value = auction_value(my_cards, flop, 0., min_samples=samples, chunk=samples, rng=rng)
+        values[combo_index(my_cards)] = round(SCALE * value.win.equity), round(SCALE * value.lose.equity)
+    return index, values
+
+
+def generate(samples, processes=None, name=TABLE_NAME, seed=0):
+    '''
+    Computes the whole table in parallel and stores it as a shared table.
+    '''
+    jobs = [(index, flop, samples, seed + index) for index, flop in enumerate(canonical_flops())]
+    # filled in place, then renamed like any shared table
+    temporary = temporary_path(name)
+    table = np.lib.format.open_memmap(temporary, mode='w+', dtype=np.uint16, shape=TABLE_SHAPE)
+    with Pool(processes) as pool:
+        for done, (index, values) in enumerate(pool.imap_unordered(flop_equities, jobs), 1):
+            table[index] = values
+            if done % 100 == 0:
+                print('{}/{} flops'.format(done, NUM_FLOPS), flush=True)
+    table.flush()
+    del table
+    os.replace(temporary, table_path(name))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python3 -m skeleton.flop')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES,
+                        help='Deals per holding, shared by both auction outcomes, defaults to {}'.format(DEFAULT_SAMPLES))
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes, defaults to the CPU count')
+    args = parser.parse_args()
+    generate(args.samples, args.processes)
@@ -0,0 +1,91 @@
+'''
+Buffered, leveled logging for pokerbots.
+
+Anything a bot prints is read by the engine while the bot's game clock runs,
+so log lines are kept in memory and written out in one go, either when the
+bot calls flush (e.g. in handle_round_over) or from a background thread.
+'''
+from collections import deque
+from threading import Event, Lock, Thread
+import sys
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = (('debug', DEBUG), ('info', INFO), ('warning', WARNING), ('error', ERROR))
+
+
+def _discard(message, *args):
+    pass
+
+
+class Logger():
+    '''
+    Keeps log records in a ring buffer and formats them only when flushing.
+    Methods for disabled levels are replaced by a no-op, so disabled calls cost a single function call.
+    '''
+
+    def __init__(self, level=INFO, capacity=10000, stream=None, interval=None):
+        '''
+        Arguments:
+        level: the lowest level that is recorded.
+        capacity: the number of records kept before the oldest ones are dropped.
+        stream: where records are written, defaults to sys.stdout.
+        interval: if given, a background thread flushes every interval seconds.
+        '''
+        self.records = deque(maxlen=capacity)
+        self.stream = stream if stream is not None else sys.stdout
+        self.set_level(level)
+        # the background thread and the bot may flush at the same time
+        self.flush_lock = Lock()
+        self.stopped = Event()
+        self.thread = None
+        if interval is not None:
+            self.thread = Thread(target=self._flush_periodically, args=(interval,), daemon=True)
+            self.thread.start()
+
+    def set_level(self, level):
+        '''
+        Enables the levels at or above level and turns the others into no-ops.
+        '''
+        self.level = level
+        for name, value in LEVELS:
+            setattr(self, name, self._record if value >= level else _discard)
+
+    def enabled(self, level):
+        '''
+        Returns True if records at level are kept, to guard expensive log arguments.
+        '''
+        return level >= self.level
+
+    def _record(self, message, *args):
+        self.records.append((message, args))
+
+    def flush(self):
+        '''
+        Formats and writes all buffered records. Safe to call from several threads.
+        '''
+        records = self.records
+        lines = []
+        with self.flush_lock:
+            while records:
+                message, args = records.popleft()
+                lines.append(message % args if args else message)
+            if lines:
+                lines.append('')
+                self.stream.write('\n'.join(lines))
+                self.stream.flush()
+
+    def _flush_periodically(self, interval):
+        while not self.stopped.wait(interval):
+            self.flush()
+
+    def close(self):
+        '''
+        Stops the background thread, if any, and flushes the remaining records.
+        '''
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.flush()
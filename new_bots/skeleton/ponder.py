@@ -0,0 +1,41 @@
+'''
+Runs a pokerbot's pondering work in the background while the opponent is thinking.
+'''
+from threading import Event, Thread
+import sys
+
+# a short switch interval lets the runner reclaim the interpreter quickly when the engine replies
+PONDER_SWITCH_INTERVAL = 0.0005
+
+
+class Ponderer():
+    '''
+    Starts the pokerbot's ponder method in a background thread after each action
+    and cancels it as soon as the engine's next message arrives.
+    '''
+
+    def __init__(self, pokerbot):
+        self.pokerbot = pokerbot
+        self.thread = None
+        self.cancelled = None
+        self.switch_interval = sys.getswitchinterval()
+
+    def start(self, game_state, round_state, active):
+        '''
+        Starts pondering on the round state the pokerbot just acted in.
+        '''
+        self.stop()
+        self.cancelled = Event()
+        self.thread = Thread(target=self.pokerbot.ponder, args=(game_state, round_state, active, self.cancelled), daemon=True)
+        sys.setswitchinterval(PONDER_SWITCH_INTERVAL)
+        self.thread.start()
+
+    def stop(self):
+        '''
+        Cancels pondering and waits for the pokerbot to notice.
+        '''
+        if self.thread is not None:
+            self.cancelled.set()
+            self.thread.join()
+            self.thread = None
+            sys.setswitchinterval(self.switch_interval)
@@ -0,0 +1,105 @@
+'''
+A pool of equity worker processes forked before the bot connects to the engine.
+
+The GIL keeps threads from sampling in parallel, so sampling is split across
+processes instead. Tasks are sent over pipes and each worker writes its counts
+into its own slot of a shared array, so the only thing that comes back over
+the pipe is a one-byte acknowledgement.
+
+Workers take cores the opponent's bot and the engine may need, so bots should
+only create a pool when asked to and keep it small.
+'''
+from multiprocessing import get_context
+import os
+import numpy as np
+from .equity import sample_outcomes
+
+SLOT_SIZE = 2  # wins, ties
+
+
+def available_cpus():
+    '''
+    Returns the number of CPUs this process may run on.
+    '''
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _work(index, conn, parent_conns, slots):
+    # the parent's pipe ends must be closed here, or recv would never see EOF when the bot exits
+    for parent_conn in parent_conns:
+        parent_conn.close()
+    rng = np.random.default_rng()
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        wins, ties = sample_outcomes(*task, rng)
+        slots[SLOT_SIZE*index] = wins
+        slots[SLOT_SIZE*index + 1] = ties
+        conn.send_bytes(b'\x01')
+
+
+class EquityPool():
+    '''
+    Splits batches of sampled deals between worker processes and the calling process.
+    Create it in the Player constructor, before run_bot connects, so forking costs no game clock.
+    Calls must not overlap, which holds as long as the ponderer is stopped before each action.
+    '''
+
+    def __init__(self, processes=None):
+        '''
+        Arguments:
+        processes: the number of workers, defaults to one less than the available CPUs; pass a small fixed number in bots.
+        '''
+        if processes is None:
+            processes = available_cpus() - 1
+        context = get_context('fork')
+        self.slots = context.RawArray('q', SLOT_SIZE * processes)
+        pipes = [context.Pipe() for _ in range(processes)]
+        self.conns = [parent_conn for parent_conn, _ in pipes]
+        self.workers = []
+        for index, (_, child_conn) in enumerate(pipes):
+            worker = context.Process(target=_work, args=(index, child_conn, self.conns, self.slots), daemon=True)
+            worker.start()
+            child_conn.close()
+            self.workers.append(worker)
+
+    @property
+    def size(self):
+        '''
+        The number of processes sampling, including the caller.
+        '''
+        return len(self.workers) + 1
+
+    def sample_outcomes(self, my_cards, board_cards, deck, samples, my_extra, opp, rng):
+        '''
+        Same as equity.sample_outcomes, but the deals are split evenly between the processes.
+        '''
+        share = samples // self.size
+        for conn in self.conns:
+            conn.send((my_cards, board_cards, deck, share, my_extra, opp))
+        # the caller samples its own share, plus the remainder, while the workers run
+        wins, ties = sample_outcomes(my_cards, board_cards, deck, samples - share * len(self.conns), my_extra, opp, rng)
+        for index, conn in enumerate(self.conns):
+            conn.recv_bytes()
+            wins += self.slots[SLOT_SIZE*index]
+            ties += self.slots[SLOT_SIZE*index + 1]
+        return wins, ties
+
+    def close(self):
+        '''
+        Stops the workers.
+        '''
+        for conn in self.conns:
+            conn.send(None)
+            conn.close()
+        for worker in self.workers:
+            worker.join()
+        self.conns = []
+        self.workers = []
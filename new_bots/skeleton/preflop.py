@@ -0,0 +1,126 @@
+'''
+Precomputed preflop equities for the 169 canonical starting hands.
+
+The table stores, for every hand class, the probability of beating a random
+opponent when we win the auction (we hold 3 cards against 2) and when we lose
+it (we hold 2 cards against 3). Generate it offline with
+
+python3 -m skeleton.preflop [--samples N] [--processes P]
+
+from a bot directory.
+'''
+from array import array
+from multiprocessing import Pool
+import argparse
+import os
+import random
+
+RANKS = '23456789TJQKA'
+SUITS = 'cdhs'
+NUM_CLASSES = 169
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.bin')
+
+
+def hand_class(cards):
+    '''
+    Returns the class index of two hole cards in common format.
+    Classes form a 13x13 grid: pairs on the diagonal, suited hands with
+    the higher rank as the row and offsuit hands with the higher rank as the column.
+    '''
+    rank1, rank2 = RANKS.index(cards[0][0]), RANKS.index(cards[1][0])
+    high, low = max(rank1, rank2), min(rank1, rank2)
+    if cards[0][1] == cards[1][1]:
+        return 13 * high + low
+    return 13 * low + high
+
+
+def class_name(index):
+    '''
+    Returns the usual name of a hand class, e.g. 'AKs', 'T9o' or '77'.
+    '''
+    row, column = divmod(index, 13)
+    if row == column:
+        return RANKS[row] * 2
+    if row > column:
+        return RANKS[row] + RANKS[column] + 's'
+    return RANKS[column] + RANKS[row] + 'o'
+
+
+def class_cards(index):
+    '''
+    Returns two hole cards belonging to a hand class.
+    '''
+    row, column = divmod(index, 13)
+    if row == column:
+        return [RANKS[row] + 'c', RANKS[row] + 'd']
+    if row > column:
+        return [RANKS[row] + 'c', RANKS[column] + 'c']
+    return [RANKS[column] + 'c', RANKS[row] + 'd']
+
+
+def load_table(path=TABLE_PATH):
+    '''
+    Loads the table as a list of (strength_w_auction, strength_wo_auction) pairs indexed by class,
+    or returns None if it has not been generated.
+    '''
+    values = array('f')
+    try:
+        with open(path, 'rb') as table_file:
+            values.fromfile(table_file, 2 * NUM_CLASSES)
+    except (OSError, EOFError):
+        return None
+    return [(values[2*i], values[2*i+1]) for i in range(NUM_CLASSES)]
+
+
+def class_equity(job):
+    '''
+    Simulates one hand class with and without the auction card.
+    '''
+    import eval7
+    index, samples, seed = job
+    rng = random.Random(seed)
+    my_cards = [eval7.Card(card) for card in class_cards(index)]
+    deck = [card for card in eval7.Deck().cards if card not in my_cards]
+    evaluate = eval7.evaluate
+    wins_w_auction = 0
+    wins_wo_auction = 0
+    for _ in range(samples):
+        draw = rng.sample(deck, 8)
+        community_cards = draw[3:]
+        # we win the auction: our extra card against two opponent cards
+        our_hand_val = evaluate(my_cards + draw[2:3] + community_cards)
+        opp_hand_val = evaluate(draw[:2] + community_cards)
+        wins_w_auction += 2 if our_hand_val > opp_hand_val else our_hand_val == opp_hand_val
+        draw = rng.sample(deck, 8)
+        community_cards = draw[3:]
+        # we lose the auction: two cards against three
+        our_hand_val = evaluate(my_cards + community_cards)
+        opp_hand_val = evaluate(draw[:3] + community_cards)
+        wins_wo_auction += 2 if our_hand_val > opp_hand_val else our_hand_val == opp_hand_val
+    return wins_w_auction / (2*samples), wins_wo_auction / (2*samples)
+
+
+def generate(samples, processes=None, path=TABLE_PATH, seed=0):
+    '''
+    Computes the whole table in parallel and writes it to path.
+    '''
+    jobs = [(index, samples, seed + index) for index in range(NUM_CLASSES)]
+    with Pool(processes) as pool:
+        results = pool.map(class_equity, jobs, chunksize=1)
+    values = array('f')
+    for strength_w_auction, strength_wo_auction in results:
+        values.append(strength_w_auction)
+        values.append(strength_wo_auction)
+    with open(path, 'wb') as table_file:
+        values.tofile(table_file)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='python3 -m skeleton.preflop')
+    parser.add_argument('--samples', type=int, default=100000, help='Samples per class and auction outcome, defaults to 100000')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes, defaults to the CPU count')
+    args = parser.parse_args()
+    results = generate(args.samples, args.processes)
+    for index in sorted(range(NUM_CLASSES), key=lambda i: -sum(results[i])):
+        print('{:>4} {:.4f} {:.4f}'.format(class_name(index), *results[index]))
@@ -0,0 +1,207 @@
+'''
+Equity against a weighted range of opponent hands.
+
+A range is a weight vector over every possible opponent holding: 1326 entries
+for two hole cards, or 22100 for three when the opponent won or tied the
+auction. Combos are listed in itertools.combinations order over evaluator
+card integers, and combos that share a card with the known cards are masked
+out before the weights are used.
+'''
+from itertools import combinations
+from math import comb, sqrt
+import numpy as np
+from . import evaluator
+from .cards import card_indices, cards_mask, deck_ints
+from .equity import Equity, make_equity
+from .sampler import draw_batch
+from .tables import shared_table
+
+RANGE_SIZES = {2: 1326, 3: 22100}
+COMBOS = {size: shared_table('combos_{}'.format(size), lambda size=size: np.array(list(combinations(range(52), size)), dtype=np.int64))
+          for size in RANGE_SIZES}
+# a combo's cards as a bit mask, for card removal
+COMBO_MASKS = {size: shared_table('combo_masks_{}'.format(size),
+                                  lambda combos=combos: (np.uint64(1) << combos.astype(np.uint64)).sum(axis=1, dtype=np.uint64))
+               for size, combos in COMBOS.items()}
+
+
+def uniform_range(opp=2):
+    '''
+    Returns a range giving every holding of opp cards the same weight.
+    '''
+    return np.ones(RANGE_SIZES[opp])
+
+
+def combo_index(cards):
+    '''
+    Returns the index of a holding in common format within its range vector.
+    '''
+    cards = sorted(card_indices(cards))
+    size = len(cards)
+    # rank of the combination in lexicographic order
+    index = 0
+    previous = -1
+    for position, card in enumerate(cards):
+        for skipped in range(previous + 1, card):
+            index += comb(51 - skipped, size - position - 1)
+        previous = card
+    return index
+
+
+def live_weights(weights, known_cards):
+    '''
+    Zeroes the weight of every combo that contains one of the known cards.
+
+    Arguments:
+    weights: a range vector of 1326 or 22100 weights.
+    known_cards: evaluator integers of the cards the opponent cannot hold.
+
+    Returns:
+    A new weight vector.
+    '''
+    size = 2 if len(weights) == RANGE_SIZES[2] else 3
+    known_mask = np.uint64(0)
+    for card in known_cards:
+        known_mask |= np.uint64(1) << np.uint64(card)
+    return np.where(COMBO_MASKS[size] & known_mask, 0., weights)
+
+
+def range_equity(my_cards, board_cards, weights, samples=2000, rng=None):
+    '''
+    Computes our equity against a weighted opponent range.
+    On the river every live combo is evaluated; before it, opponent combos are drawn by weight
+    and runouts uniformly from the cards left.
+
+    Arguments:
+    my_cards: our hole cards in common format.
+    board_cards: the board cards in common format.
+    weights: a range vector of 1326 or 22100 non-negative weights.
+    samples: the number of deals sampled before the river.
+    rng: an optional numpy Generator.
+
+    Returns:
+    An Equity tuple, or None if no combo in the range is live.
+    '''
+    size = 2 if len(weights) == RANGE_SIZES[2] else 3
+    my_cards = np.array(card_indices(my_cards), dtype=np.int64)
+    board_cards = np.array(card_indices(board_cards), dtype=np.int64)
+    known = np.concatenate((my_cards, board_cards))
+    weights = live_weights(np.asarray(weights, dtype=np.float64), known)
+    total = weights.sum()
+    if total <= 0:
+        return None
+    combos = COMBOS[size]
+    community_left = 5 - len(board_cards)
+    if community_left == 0:
+        live = np.flatnonzero(weights)
+        our_value = evaluator.evaluate(known[None, :])[0]
+        opp_hands = np.concatenate((combos[live], np.broadcast_to(board_cards, (len(live), 5))), axis=1)
+        opp_values = evaluator.evaluate(opp_hands)
+        probabilities = weights[live] / total
+        win = probabilities[our_value > opp_values].sum()
+        tie = probabilities[our_value == opp_values].sum()
+        return Equity(win + tie / 2, win, tie, 0., len(live))
+
+    if rng is None:
+        rng = np.random.default_rng()
+    opp_cards = combos[rng.choice(len(combos), size=samples, p=weights / total)]
+    # runouts are uniform over the cards neither we, the board nor the sampled opponent hold
+    keys = rng.random((samples, 52))
+    keys[:, known] = 2.
+    np.put_along_axis(keys, opp_cards, 2., axis=1)
+    runouts = np.argpartition(keys, community_left - 1, axis=1)[:, :community_left]
+    community = np.concatenate((np.broadcast_to(board_cards, (samples, len(board_cards))), runouts), axis=1)
+    our_values = evaluator.evaluate(np.concatenate((np.broadcast_to(my_cards, (samples, len(my_cards))), community), axis=1))
+    opp_values = evaluator.evaluate(np.concatenate((opp_cards, community), axis=1))
+    return make_equity(int(np.count_nonzero(our_values > opp_values)), int(np.count_nonzero(our_values == opp_values)), samples)
+
+
+def stratified_equity(my_cards, board_cards, samples, opp=2, runouts=2, rng=None):
+    '''
+    Estimates equity against a uniformly random opponent, stratified by the opponent's holding.
+    Every live holding (or, when samples are too few for that, a random subset of them) gets
+    the same number of runouts, so only the runout is left to chance within a holding.
+
+    Arguments:
+    my_cards: our hole cards, as Cards or in common format.
+    board_cards: the board cards, as Cards or in common format.
+    samples: roughly the number of deals to evaluate.
+    opp: the number of opponent hole cards.
+    runouts: the fewest runouts per holding; at least 2, so the spread within holdings can be measured.
+    rng: an optional numpy Generator.
+
+    Returns:
+    An Equity tuple whose std_error is the two-stage stratified standard error.
+    '''
+    if len(board_cards) == 5:
+        return range_equity(my_cards, board_cards, uniform_range(opp))
+    if rng is None:
+        rng = np.random.default_rng()
+    my_ints = card_indices(my_cards)
+    board_ints = card_indices(board_cards)
+    known = np.array(my_ints + board_ints, dtype=np.int64)
+    holdings = COMBOS[opp][np.flatnonzero(live_weights(uniform_range(opp), known))]
+    total = len(holdings)
+    chosen = min(total, max(samples // runouts, 1))
+    if chosen < total:
+        holdings = holdings[rng.choice(total, chosen, replace=False)]
+    else:
+        runouts = max(runouts, samples // total)
+    rows = chosen * runouts
+    opp_cards = np.repeat(holdings, runouts, axis=0)
+    # draw opp extra cards and keep the first community_left of them that the holding does not use,
+    # which is a uniform runout from the cards the holding leaves
+    community_left = 5 - len(board_ints)
+    deck = deck_ints(cards_mask(known.tolist()))
+    draw = draw_batch(deck, rows, community_left + opp, rng)
+    free = (draw[:, :, None] != opp_cards[:, None, :]).all(axis=2)
+    order = np.argsort(~free, axis=1, kind='stable')[:, :community_left]
+    community = np.concatenate((np.broadcast_to(board_ints, (rows, len(board_ints))), np.take_along_axis(draw, order, axis=1)), axis=1)
+    our_values = evaluator.evaluate(np.concatenate((np.broadcast_to(my_ints, (rows, len(my_ints))), community), axis=1))
+    opp_values = evaluator.evaluate(np.concatenate((opp_cards, community), axis=1))
+    wins = (our_values > opp_values).reshape(chosen, runouts)
+    ties = (our_values == opp_values).reshape(chosen, runouts)
+    scores = wins + ties / 2
+    holding_means = scores.mean(axis=1)
+    within = scores.var(axis=1, ddof=1).mean()
+    between = holding_means.var(ddof=1) if chosen > 1 else 0.
+    sampled = chosen / total
+    # two-stage sampling: holdings without replacement, then runouts within each chosen holding
+    variance = (1 - sampled) * between / chosen + sampled * within / (chosen * runouts)
+    return Equity(holding_means.mean(), wins.mean(), ties.mean(), sqrt(max(variance, 0.)), rows)
+
+
+if __name__ == '__main__':
+    # self-check: a uniform range must agree with plain enumeration and sampling
+    import time
+    from .equity import exact_equity, batch_equity
+    assert all(combo_index([evaluator.RANKS[c % 13] + evaluator.SUITS[c // 13] for c in COMBOS[size][i]]) == i
+               for size in RANGE_SIZES for i in range(0, RANGE_SIZES[size], 97))
+    for my_cards, board_cards, opp in ((['Ad', 'Kd'], ['Qd', 'Jd', '3s', '4h', '9c'], 2),
+                                       (['Ad', 'Kd', '2c'], ['Qd', 'Jd', '3s', '4h', '9c'], 3)):
+        start = time.perf_counter()
+        result = range_equity(my_cards, board_cards, uniform_range(opp))
+        elapsed = time.perf_counter() - start
+        print('river {} vs {}: {:.4f} (enumerated {:.4f}) in {:.1f} ms'.format(
+            my_cards, opp, result.equity, exact_equity(my_cards, board_cards, opp), 1000 * elapsed))
+    for my_cards, board_cards, opp in ((['Ad', 'Kd'], ['Qd', 'Jd', '3s'], 3), (['7c', '7h', 'Ts'], ['Qd', 'Jd', '3s', '4h'], 2)):
+        start = time.perf_counter()
+        result = range_equity(my_cards, board_cards, uniform_range(opp), samples=20000)
+        elapsed = time.perf_counter() - start
+        print('{} on {} vs {}: {:.4f} +- {:.4f} (uniform sampler {:.4f}) in {:.1f} ms'.format(
+            my_cards, board_cards, opp, result.equity, result.std_error,
+            batch_equity(my_cards, board_cards, 20000, 0, opp).equity, 1000 * elapsed))
+    # stratified against plain sampling at the same number of deals: reported and observed spread over repeats
+    repeats = 40
+    for my_cards, board_cards, opp in ((['Qd', 'Jc'], ['Ah', 'Kd', '2s'], 2), (['7c', '7h'], ['Qd', 'Jd', '3s', '4h'], 2)):
+        for samples in (3000, 20000):
+            start = time.perf_counter()
+            stratified = [stratified_equity(my_cards, board_cards, samples, opp) for _ in range(repeats)]
+            stratified_time = (time.perf_counter() - start) / repeats
+            start = time.perf_counter()
+            plain = [batch_equity(my_cards, board_cards, samples, 0, opp) for _ in range(repeats)]
+            plain_time = (time.perf_counter() - start) / repeats
+            print('{} on {}, {} deals: stratified sd {:.4f} (reported {:.4f}, {:.1f} ms), plain sd {:.4f} (reported {:.4f}, {:.1f} ms)'.format(
+                my_cards, board_cards, samples,
+                np.std([e.equity for e in stratified]), np.mean([e.std_error for e in stratified]), 1000 * stratified_time,
+                np.std([e.equity for e in plain]), np.mean([e.std_error for e in plain]), 1000 * plain_time))
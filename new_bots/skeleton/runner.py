@@ -3,10 +3,16 @@ The infrastructure for interacting with the engine.
 '''
 import argparse
 import socket
-from .actions import FoldAction, CallAction, CheckAction, RaiseAction, BidAction
+from .actions import CheckAction
+from rules.codec import ACTION_TYPES, encode_action, decode_clause
 from .states import GameState, TerminalState, RoundState
 from .states import STARTING_STACK, BIG_BLIND, SMALL_BLIND
 from .bot import Bot
+from .cards import Cards
+from .ponder import Ponderer
+
+BUFFER_SIZE = 4096
+NO_CARDS = Cards(())  # unknown hands and the empty board
 
 
 class Runner():
@@ -14,103 +20,106 @@ class Runner():
     Interacts with the engine.
     '''
 
-    def __init__(self, pokerbot, socketfile):
+    def __init__(self, pokerbot, sock):
         self.pokerbot = pokerbot
-        self.socketfile = socketfile
+        self.sock = sock
+        # only start pondering threads for pokerbots that override Bot.ponder
+        self.ponderer = Ponderer(pokerbot) if type(pokerbot).ponder is not Bot.ponder else None
 
     def receive(self):
         '''
         Generator for incoming messages from the engine.
+        Frames lines directly in a reusable receive buffer and stops when the engine disconnects.
         '''
+        buffer = bytearray(BUFFER_SIZE)
+        view = memoryview(buffer)
+        start = end = 0
         while True:
-            packet = self.socketfile.readline().strip().split(' ')
-            if not packet:
-                break
-            yield packet
+            newline = buffer.find(b'\n', start, end)
+            if newline < 0:
+                if start == end:
+                    start = end = 0
+                elif start > 0:  # move the partial line to the front of the buffer
+                    view[:end - start] = view[start:end]
+                    end -= start
+                    start = 0
+                if end == len(buffer):  # a single line fills the whole buffer
+                    view.release()
+                    buffer.extend(bytes(len(buffer)))
+                    view = memoryview(buffer)
+                try:
+                    received = self.sock.recv_into(view[end:])
+                except OSError:
+                    received = 0
+                if received == 0:
+                    return
+                end += received
+                continue
+            line_start, start = start, newline + 1
+            if newline > line_start:
+                yield str(view[line_start:newline], 'ascii').split(' ')
 
     def send(self, action):
         '''
         Encodes an action and sends it to the engine.
         '''
-        if isinstance(action, FoldAction):
-            code = 'F'
-        elif isinstance(action, CallAction):
-            code = 'C'
-        elif isinstance(action, CheckAction):
-            code = 'K'
-        elif isinstance(action, BidAction): 
-            code = 'A' + str(action.amount)
-        else:  # isinstance(action, RaiseAction)
-            code = 'R' + str(action.amount)
-        self.socketfile.write(code + '\n')
-        self.socketfile.flush()
+        self.sock.sendall((encode_action(action) + '\n').encode())
 
     def run(self):
         '''
         Reconstructs the game tree based on the action history received from the engine.
+        Hands and the board are Cards, so their integer and mask forms are computed once per message.
         '''
         game_state = GameState(0, 0., 1)
         round_state = None
         active = 0
         round_flag = True
         for packet in self.receive():
-            # print(packet)
+            if self.ponderer is not None:
+                self.ponderer.stop()
             for clause in packet:
-                if clause[0] == 'T':
-                    game_state = GameState(game_state.bankroll, float(clause[1:]), game_state.round_num)
-                elif clause[0] == 'P':
-                    active = int(clause[1:])
-                elif clause[0] == 'H':
-                    hands = [[], []]
-                    hands[active] = clause[1:].split(',')
-                    pips = [SMALL_BLIND, BIG_BLIND]
-                    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
-                    round_state = RoundState(0, 0, False, [None, None], pips, stacks, hands, [], None)
+                code, value = decode_clause(clause)
+                if code in ACTION_TYPES:
+                    round_state = round_state.proceed(value)
+                elif code == 'T':
+                    game_state = GameState(game_state.bankroll, value, game_state.round_num)
+                elif code == 'P':
+                    active = value
+                elif code == 'H':
+                    hands = (Cards(value), NO_CARDS) if active == 0 else (NO_CARDS, Cards(value))
+                    pips = (SMALL_BLIND, BIG_BLIND)
+                    stacks = (STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND)
+                    round_state = RoundState(0, 0, False, (None, None), pips, stacks, hands, NO_CARDS, None)
                     if round_flag:
                         self.pokerbot.handle_new_round(game_state, round_state, active)
                         round_flag = False
-                elif clause[0] == 'F':
-                    round_state = round_state.proceed(FoldAction())
-                elif clause[0] == 'C':
-                    round_state = round_state.proceed(CallAction())
-                elif clause[0] == 'K':
-                    round_state = round_state.proceed(CheckAction())
-                elif clause[0] == 'R':
-                    round_state = round_state.proceed(RaiseAction(int(clause[1:])))
-                elif clause[0] == 'A': 
-                    round_state = round_state.proceed(BidAction(int(clause[1:])))
-                elif clause[0] == 'N':
-                    hands = [[], []]
-                    stacks, bids, active_hands = clause[1:].split('_')
-                    bids = bids.split(',')
-                    stacks = stacks.split(',')
-                    hands[active] = active_hands.split(',')
-                    round_state = RoundState(round_state.button, round_state.street, round_state.auction, [int(x) for x in bids], round_state.pips, [int(x) for x in stacks], hands, [], round_state)
-                elif clause[0] == 'B':
+                elif code == 'N':
+                    stacks, bids, active_hand = value
+                    hands = (Cards(active_hand), NO_CARDS) if active == 0 else (NO_CARDS, Cards(active_hand))
+                    round_state = RoundState(round_state.button, round_state.street, round_state.auction, bids, round_state.pips, stacks, hands, NO_CARDS, round_state)
+                elif code == 'B':
                     round_state = RoundState(round_state.button, round_state.street, round_state.auction, round_state.bids, 
-                                            round_state.pips, round_state.stacks, round_state.hands, clause[1:].split(','), 
+                                            round_state.pips, round_state.stacks, round_state.hands, Cards(value), 
                                             round_state.previous_state)
-                elif clause[0] == 'O':
+                elif code == 'O':
                     # backtrack
                     round_state = round_state.previous_state
-                    revised_hands = list(round_state.hands)
-                    revised_hands[1-active] = clause[1:].split(',')
+                    revised_hands = (round_state.hands[0], Cards(value)) if active == 0 else (Cards(value), round_state.hands[1])
                     # rebuild history
                     round_state = RoundState(round_state.button, round_state.street, round_state.auction, round_state.bids, 
                                             round_state.pips, round_state.stacks, revised_hands, round_state.deck, 
                                             round_state.previous_state)
-                    round_state = TerminalState([0, 0], round_state.bids, round_state)
-                elif clause[0] == 'D':
+                    round_state = TerminalState((0, 0), round_state.bids, round_state)
+                elif code == 'D':
                     assert isinstance(round_state, TerminalState)
-                    delta = int(clause[1:])
-                    deltas = [-delta, -delta]
-                    deltas[active] = delta
+                    delta = value
+                    deltas = (delta, -delta) if active == 0 else (-delta, delta)
                     round_state = TerminalState(deltas, round_state.bids, round_state.previous_state)
                     game_state = GameState(game_state.bankroll + delta, game_state.game_clock, game_state.round_num)
                     self.pokerbot.handle_round_over(game_state, round_state, active)
                     game_state = GameState(game_state.bankroll, game_state.game_clock, game_state.round_num + 1)
                     round_flag = True
-                elif clause[0] == 'Q':
+                elif code == 'Q':
                     return
             if round_flag:  # ack the engine
                 self.send(CheckAction())
@@ -118,6 +127,10 @@ class Runner():
                 assert active == round_state.button % 2
                 action = self.pokerbot.get_action(game_state, round_state, active)
                 self.send(action)
+                if self.ponderer is not None:
+                    self.ponderer.start(game_state, round_state, active)
+        if self.ponderer is not None:
+            self.ponderer.stop()
 
 
 def parse_args():
@@ -139,8 +152,6 @@ def run_bot(pokerbot, args):
     except OSError:
         print('Could not connect to {}:{}'.format(args.host, args.port))
         return
-    socketfile = sock.makefile('rw')
-    runner = Runner(pokerbot, socketfile)
+    runner = Runner(pokerbot, sock)
     runner.run()
-    socketfile.close()
     sock.close()
@@ -0,0 +1,99 @@
+'''
+Draws k distinct cards from a deck with a partial Fisher-Yates shuffle.
+
+Only the first k positions are shuffled, so a draw costs k swaps instead of a
+shuffle of the whole deck. Pass a seeded random.Random (draw) or numpy
+Generator (draw_batch) for reproducible draws.
+Run python3 -m skeleton.sampler from a bot directory for a benchmark.
+'''
+import numpy as np
+
+
+def draw(deck, k, rng):
+    '''
+    Draws k distinct cards.
+
+    Arguments:
+    deck: a sequence of cards to draw from, e.g. a list of eval7.Cards.
+    k: the number of cards to draw.
+    rng: a random.Random, which is much cheaper per call than a numpy Generator.
+
+    Returns:
+    A list of k cards in random order.
+    '''
+    cards = list(deck)
+    n = len(cards)
+    random = rng.random
+    for i in range(k):
+        j = i + int(random() * (n - i))
+        cards[i], cards[j] = cards[j], cards[i]
+    return cards[:k]
+
+
+def draw_batch(deck, samples, k, rng):
+    '''
+    Draws k distinct cards for each of many samples at once.
+
+    Arguments:
+    deck: an integer array of cards below 128 to draw from.
+    samples: the number of samples.
+    k: the number of cards per sample.
+    rng: a numpy Generator.
+
+    Returns:
+    An int64 array of shape (samples, k).
+    '''
+    n = len(deck)
+    # one byte per card keeps the per-row copies of the deck cheap
+    cards = np.tile(np.asarray(deck, dtype=np.int8), (samples, 1))
+    rows = np.arange(samples)
+    swaps = rng.integers(np.arange(k)[:, None], n, size=(k, samples))
+    for i in range(k):
+        j = swaps[i]
+        card = cards[rows, j]
+        cards[rows, j] = cards[:, i]
+        cards[:, i] = card
+    return cards[:, :k].astype(np.int64)
+
+
+if __name__ == '__main__':
+    import random
+    import time
+    import eval7
+    rng = np.random.default_rng(0)
+    deck = np.arange(47)
+    k = 7
+    samples = 2000
+    repeats = 50
+
+    eval7_deck = eval7.Deck()
+    eval7_deck.cards = eval7_deck.cards[:47]
+    start = time.perf_counter()
+    for _ in range(samples):
+        eval7_deck.shuffle()
+        eval7_deck.peek(k)
+    print('eval7 shuffle then peek: {:.3f} us/sample'.format(1e6 * (time.perf_counter() - start) / samples))
+
+    single_rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(samples):
+        draw(eval7_deck.cards, k, single_rng)
+    print('draw: {:.3f} us/sample'.format(1e6 * (time.perf_counter() - start) / samples))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        deck[np.argpartition(rng.random((samples, len(deck))), k - 1, axis=1)[:, :k]]
+    print('argpartition of random keys: {:.3f} us/sample'.format(1e6 * (time.perf_counter() - start) / (repeats * samples)))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        draw_batch(deck, samples, k, rng)
+    print('draw_batch: {:.3f} us/sample'.format(1e6 * (time.perf_counter() - start) / (repeats * samples)))
+
+    # every card should land in every drawn position equally often
+    draws = draw_batch(deck, 100000, k, rng)
+    counts = np.array([np.bincount(draws[:, position], minlength=len(deck)) for position in range(k)])
+    assert all(len(set(row)) == k for row in draws[:1000].tolist())
+    expected = 100000 / len(deck)
+    print('largest deviation from uniform: {:.1f} standard deviations'.format(np.abs(counts - expected).max() / np.sqrt(expected)))
+    assert np.array_equal(draw_batch(deck, 10, k, np.random.default_rng(2)), draw_batch(deck, 10, k, np.random.default_rng(2)))
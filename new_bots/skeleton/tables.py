@@ -0,0 +1,73 @@
+'''
+Read-only lookup tables shared by every bot process on a machine.
+
+Each table is an .npy file next to this module that bots map read-only, so
+all processes mapping it use the same pages of the page cache: loading costs
+a few system calls whatever the table's size, and memory stays flat however
+many matches run at once. A missing table is built by the first process that
+needs it and written under a temporary name before being renamed into place,
+so other processes never map a partial file. Delete the files to rebuild them.
+'''
+import os
+import numpy as np
+
+TABLE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def table_path(name):
+    '''
+    Returns the file a table is stored in.
+    '''
+    return os.path.join(TABLE_DIR, name + '.npy')
+
+
+def map_table(name):
+    '''
+    Maps a stored table read-only, or returns None if it is missing or unreadable.
+    '''
+    try:
+        # a plain ndarray view of the mapping indexes much faster than the memmap subclass
+        return np.load(table_path(name), mmap_mode='r').view(np.ndarray)
+    except (OSError, ValueError):
+        return None
+
+
+def temporary_path(name):
+    '''
+    Returns the file a table is written to before it is renamed into place, unique to this process.
+    '''
+    return '{}.{}.tmp'.format(table_path(name), os.getpid())
+
+
+def save_table(name, values):
+    '''
+    Writes a table atomically. Returns whether it was written.
+    '''
+    path = table_path(name)
+    temporary = temporary_path(name)
+    try:
+        with open(temporary, 'wb') as table_file:
+            np.save(table_file, values)
+        os.replace(temporary, path)
+    except OSError:
+        return False
+    return True
+
+
+def shared_table(name, build):
+    '''
+    Maps a table, building and storing it first if it is missing.
+
+    Arguments:
+    name: the table's file name without extension; include whatever the contents depend on.
+    build: a function returning the table as an array.
+
+    Returns:
+    A read-only array, or the freshly built one if it could not be stored.
+    '''
+    values = map_table(name)
+    if values is None:
+        values = np.asarray(build())
+        if save_table(name, values):
+            values = map_table(name)
+    return values
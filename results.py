@@ -0,0 +1,168 @@
+'''
+SQLite store for the match and round summaries recorded by the engine.
+'''
+
+import sqlite3
+import time
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    player_0 TEXT NOT NULL,
+    version_0 TEXT,
+    player_1 TEXT NOT NULL,
+    version_1 TEXT,
+    num_rounds INTEGER NOT NULL DEFAULT 0,
+    bankroll_0 INTEGER,
+    bankroll_1 INTEGER
+);
+CREATE TABLE IF NOT EXISTS rounds (
+    match_id INTEGER NOT NULL REFERENCES matches(id),
+    round_num INTEGER NOT NULL,
+    started REAL NOT NULL,
+    bot TEXT NOT NULL,
+    version TEXT,
+    opponent TEXT NOT NULL,
+    opponent_version TEXT,
+    seat INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    bid INTEGER,
+    opponent_bid INTEGER,
+    auction TEXT,
+    street INTEGER NOT NULL,
+    showdown INTEGER NOT NULL,
+    result TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS matches_started ON matches (started);
+CREATE INDEX IF NOT EXISTS matches_pair ON matches (player_0, player_1);
+CREATE INDEX IF NOT EXISTS rounds_match ON rounds (match_id, round_num);
+CREATE INDEX IF NOT EXISTS rounds_pair ON rounds (bot, opponent, started);
+CREATE INDEX IF NOT EXISTS rounds_started ON rounds (started);
+CREATE INDEX IF NOT EXISTS rounds_outcome ON rounds (bot, auction, showdown, result);
+CREATE INDEX IF NOT EXISTS rounds_version_outcome ON rounds (version, auction, showdown, result);
+'''
+
+ROUND_COLUMNS = ('match_id', 'round_num', 'started', 'bot', 'version', 'opponent', 'opponent_version',
+                 'seat', 'delta', 'bid', 'opponent_bid', 'auction', 'street', 'showdown', 'result')
+INSERT_ROUND = 'INSERT INTO rounds ({}) VALUES ({})'.format(', '.join(ROUND_COLUMNS), ', '.join('?' * len(ROUND_COLUMNS)))
+
+
+def auction_result(bid, opponent_bid):
+    '''
+    Returns 'won', 'lost' or 'tied' for a pair of bids, or None if the auction never happened.
+    '''
+    if bid is None or opponent_bid is None:
+        return None
+    if bid == opponent_bid:
+        return 'tied'
+    return 'won' if bid > opponent_bid else 'lost'
+
+
+def round_result(delta):
+    '''
+    Returns 'win', 'loss' or 'split' for a bankroll delta.
+    '''
+    if delta == 0:
+        return 'split'
+    return 'win' if delta > 0 else 'loss'
+
+
+class ResultsStore():
+    '''
+    Buffers round summaries and writes them to SQLite in batched transactions.
+    A store may be shared between threads as long as the callers serialize access.
+    '''
+
+    def __init__(self, filename, batch_size=500):
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self.batch_size = batch_size
+        self.pending = []
+
+    def begin_match(self, players, versions):
+        '''
+        Records the start of a match and returns its id.
+        '''
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO matches (started, player_0, version_0, player_1, version_1) VALUES (?, ?, ?, ?, ?)',
+                (time.time(), players[0], versions[0], players[1], versions[1]))
+        return cursor.lastrowid
+
+    def add_round(self, match_id, round_num, players, versions, deltas, bids, street, showdown):
+        '''
+        Buffers one summary row per seat for a finished round.
+        players, versions, deltas and bids are indexed by seat, where seat 0 is the small blind.
+        '''
+        started = time.time()
+        for seat in range(2):
+            delta = deltas[seat]
+            bid, opponent_bid = bids[seat], bids[1-seat]
+            self.pending.append((match_id, round_num, started, players[seat], versions[seat],
+                                 players[1-seat], versions[1-seat], seat, delta, bid, opponent_bid,
+                                 auction_result(bid, opponent_bid), street, int(showdown), round_result(delta)))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Writes all buffered rows in a single transaction.
+        '''
+        if self.pending:
+            with self.connection:
+                self.connection.executemany(INSERT_ROUND, self.pending)
+            self.pending = []
+
+    def end_match(self, match_id, num_rounds, bankrolls):
+        '''
+        Flushes the remaining rows and records the final bankrolls of a match.
+        '''
+        self.flush()
+        with self.connection:
+            self.connection.execute('UPDATE matches SET num_rounds = ?, bankroll_0 = ?, bankroll_1 = ? WHERE id = ?',
+                                    (num_rounds, bankrolls[0], bankrolls[1], match_id))
+
+    def import_match(self, match, rounds):
+        '''
+        Copies a match row and its round rows from another results database, as returned by
+        export_match, and returns the new match id.
+        '''
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO matches (started, player_0, version_0, player_1, version_1, num_rounds, bankroll_0, bankroll_1) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', match[1:])
+            match_id = cursor.lastrowid
+            self.connection.executemany(INSERT_ROUND, [(match_id,) + tuple(row[1:]) for row in rounds])
+        return match_id
+
+    def export_match(self, match_id):
+        '''
+        Returns the match row and round rows of one match.
+        '''
+        self.flush()
+        match = self.connection.execute('SELECT * FROM matches WHERE id = ?', (match_id,)).fetchone()
+        rounds = self.connection.execute('SELECT * FROM rounds WHERE match_id = ? ORDER BY round_num, seat', (match_id,)).fetchall()
+        return match, rounds
+
+    def rounds(self, **filters):
+        '''
+        Returns the round rows matching the given column values, e.g.
+        rounds(version='4_2', auction='won', showdown=1, result='loss').
+        '''
+        for column in filters:
+            if column not in ROUND_COLUMNS:
+                raise ValueError('unknown column ' + column)
+        query = 'SELECT * FROM rounds'
+        if filters:
+            query += ' WHERE ' + ' AND '.join(column + ' = ?' for column in filters)
+        return self.connection.execute(query, tuple(filters.values())).fetchall()
+
+    def close(self):
+        '''
+        Flushes buffered rows and closes the database.
+        '''
+        self.flush()
+        self.connection.close()
@@ -0,0 +1,6 @@
+'''
+The rules and the socket protocol shared by the engine and every bot: the
+actions, the RoundState game tree and the clause codec. Bot skeletons put the
+repository root on the path and re-export these, so each skeleton keeps its
+own runner and bot while the engine and all bots agree on one set of rules.
+'''
@@ -0,0 +1,118 @@
+'''
+Encodes and decodes the clauses of the socket protocol shared by the engine and the bots.
+
+T#.### the player's game clock
+P# the player's index
+H**,** the player's hand in common format
+F a fold action in the round history
+C a call action in the round history
+K a check action in the round history
+R### a raise action in the round history
+A### a bid action in the round history
+N#,#_#,#_**,** the stacks, bids and player's hand after the auction
+B**,**,**,**,** the board cards in common format
+O**,** the opponent's hand in common format
+D### the player's bankroll delta from the round
+Q game over
+
+Clauses are separated by spaces and messages end with '\n'.
+'''
+from .actions import FoldAction, CallAction, CheckAction, RaiseAction, BidAction
+
+FOLD = FoldAction()
+CALL = CallAction()
+CHECK = CheckAction()
+
+ACTION_ENCODERS = {
+    FoldAction: lambda action: 'F',
+    CallAction: lambda action: 'C',
+    CheckAction: lambda action: 'K',
+    RaiseAction: lambda action: 'R' + str(action.amount),
+    BidAction: lambda action: 'A' + str(action.amount),
+}
+
+ACTION_DECODERS = {
+    'F': lambda body: FOLD,
+    'C': lambda body: CALL,
+    'K': lambda body: CHECK,
+    'R': lambda body: RaiseAction(int(body)),
+    'A': lambda body: BidAction(int(body)),
+}
+
+ACTION_TYPES = {'F': FoldAction, 'C': CallAction, 'K': CheckAction, 'R': RaiseAction, 'A': BidAction}
+
+
+def encode_cards(cards):
+    return ','.join(map(str, cards))
+
+
+def decode_cards(body):
+    return body.split(',') if body else []
+
+
+def encode_auction(value):
+    stacks, bids, hand = value
+    return '{},{}_{},{}_{}'.format(stacks[0], stacks[1], bids[0], bids[1], encode_cards(hand))
+
+
+def decode_auction(body):
+    stacks, bids, hand = body.split('_')
+    stack0, stack1 = stacks.split(',')
+    bid0, bid1 = bids.split(',')
+    return (int(stack0), int(stack1)), (int(bid0), int(bid1)), decode_cards(hand)
+
+
+CLAUSE_ENCODERS = {
+    'T': '{:.3f}'.format,
+    'P': str,
+    'H': encode_cards,
+    'N': encode_auction,
+    'B': encode_cards,
+    'O': encode_cards,
+    'D': str,
+    'Q': lambda value: '',
+}
+
+CLAUSE_DECODERS = {
+    'T': float,
+    'P': int,
+    'H': decode_cards,
+    'N': decode_auction,
+    'B': decode_cards,
+    'O': decode_cards,
+    'D': int,
+    'Q': lambda body: None,
+}
+CLAUSE_DECODERS.update(ACTION_DECODERS)
+
+
+def encode_action(action):
+    '''
+    Returns the clause for an action.
+    '''
+    return ACTION_ENCODERS[type(action)](action)
+
+
+def decode_action(clause):
+    '''
+    Returns the action for a clause.
+    Raises IndexError, KeyError or ValueError if the clause is misformatted.
+    '''
+    return ACTION_DECODERS[clause[0]](clause[1:])
+
+
+def encode_clause(code, value=None):
+    '''
+    Returns the clause for a non-action value, e.g. encode_clause('B', board).
+    '''
+    return code + CLAUSE_ENCODERS[code](value)
+
+
+def decode_clause(clause):
+    '''
+    Returns the (code, value) pair for any clause, where actions decode to action objects.
+    Raises IndexError, KeyError or ValueError if the clause is misformatted.
+    '''
+    code = clause[0]
+    return code, CLAUSE_DECODERS[code](clause[1:])
+
@@ -0,0 +1,145 @@
+'''
+Encapsulates game and round state information.
+Bots use RoundState as is; the engine subclasses it to add the deck and the showdown.
+'''
+from collections import namedtuple
+from .actions import FoldAction, CallAction, CheckAction, RaiseAction, BidAction
+
+GameState = namedtuple('GameState', ['bankroll', 'game_clock', 'round_num'])
+TerminalState = namedtuple('TerminalState', ['deltas', 'bids', 'previous_state'])
+
+NUM_ROUNDS = 1000
+STARTING_STACK = 400
+BIG_BLIND = 2
+SMALL_BLIND = 1
+
+# legal action sets are shared instead of being rebuilt on every call
+BID_ACTIONS = frozenset({BidAction})
+CHECK_ACTIONS = frozenset({CheckAction})
+CHECK_RAISE_ACTIONS = frozenset({CheckAction, RaiseAction})
+FOLD_CALL_ACTIONS = frozenset({FoldAction, CallAction})
+FOLD_CALL_RAISE_ACTIONS = frozenset({FoldAction, CallAction, RaiseAction})
+
+
+class RoundState(namedtuple('_RoundState', ['button', 'street', 'auction', 'bids', 'pips', 'stacks', 'hands', 'deck', 'previous_state'])):
+    '''
+    Encodes the game tree for one round of poker.
+    bids, pips and stacks are pairs indexed by player and are never modified in place.
+    '''
+    __slots__ = ()
+
+    # the engine overrides these with the values from its config
+    STARTING_STACK = STARTING_STACK
+    BIG_BLIND = BIG_BLIND
+
+    def showdown(self):
+        '''
+        Compares the players' hands and computes payoffs.
+        The player does not know the opponent's cards, so the payoffs are filled in by the engine.
+        '''
+        return TerminalState((0, 0), self.bids, self)
+
+    def auction_hands(self, bids):
+        '''
+        Returns the hands after an auction with the given bids.
+        The player learns its new hand from the engine, so the hands are unchanged here.
+        '''
+        return self.hands
+
+    def legal_actions(self):
+        '''
+        Returns a set which corresponds to the active player's legal moves.
+        '''
+        if self.auction:
+            return BID_ACTIONS
+        active = self.button % 2
+        continue_cost = self.pips[1-active] - self.pips[active]
+        if continue_cost == 0:
+            # we can only raise the stakes if both players can afford it
+            bets_forbidden = (self.stacks[0] == 0 or self.stacks[1] == 0)
+            return CHECK_ACTIONS if bets_forbidden else CHECK_RAISE_ACTIONS
+        # continue_cost > 0
+        # similarly, re-raising is only allowed if both players can afford it
+        raises_forbidden = (continue_cost >= self.stacks[active] or self.stacks[1-active] == 0)
+        return FOLD_CALL_ACTIONS if raises_forbidden else FOLD_CALL_RAISE_ACTIONS
+
+    def raise_bounds(self):
+        '''
+        Returns a tuple of the minimum and maximum legal raises.
+        '''
+        active = self.button % 2
+        continue_cost = self.pips[1-active] - self.pips[active]
+        # can not raise to a value opponent can't afford.
+        max_contribution = min(self.stacks[active], self.stacks[1-active] + continue_cost)
+        min_contribution = min(max_contribution, continue_cost + max(continue_cost, self.BIG_BLIND))
+        return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
+
+    def bid_bounds(self):
+        '''
+        Returns a tuple of the minimum and maximum legal bid amounts.
+        '''
+        return (0, self.stacks[self.button % 2])
+
+    def proceed_street(self):
+        '''
+        Resets the players' pips and advances the game tree to the next round of betting.
+        '''
+        if self.street == 5:
+            return self.showdown()
+        if self.street == 0:  # immediately after flop is dealt, we enter the auction
+            return type(self)(1, 3, True, self.bids, (0, 0), self.stacks, self.hands, self.deck, self)
+        return type(self)(1, self.street + 1, False, self.bids, (0, 0), self.stacks, self.hands, self.deck, self)
+
+    def proceed(self, action):
+        '''
+        Advances the game tree by one action performed by the active player.
+        '''
+        active = self.button % 2
+        action_type = type(action)
+        if action_type is FoldAction:
+            delta = self.stacks[0] - self.STARTING_STACK if active == 0 else self.STARTING_STACK - self.stacks[1]
+            return TerminalState((delta, -delta), self.bids, self)
+        if action_type is CallAction:
+            if self.button == 0:  # sb calls bb preflop
+                stack = self.STARTING_STACK - self.BIG_BLIND
+                return type(self)(1, 0, self.auction, self.bids, (self.BIG_BLIND, self.BIG_BLIND), (stack, stack), self.hands, self.deck, self)
+            # both players acted
+            pip0, pip1 = self.pips
+            stack0, stack1 = self.stacks
+            if active == 0:
+                stack0 -= pip1 - pip0
+                pip0 = pip1
+            else:
+                stack1 -= pip0 - pip1
+                pip1 = pip0
+            state = type(self)(self.button + 1, self.street, self.auction, self.bids, (pip0, pip1), (stack0, stack1), self.hands, self.deck, self)
+            return state.proceed_street()
+        if action_type is CheckAction:
+            if (self.street == 0 and self.button > 0) or self.button > 1:  # both players acted
+                return self.proceed_street()
+            # let opponent act
+            return type(self)(self.button + 1, self.street, self.auction, self.bids, self.pips, self.stacks, self.hands, self.deck, self)
+        if action_type is BidAction:
+            bids = (action.amount, self.bids[1]) if active == 0 else (self.bids[0], action.amount)
+            if None in bids:
+                return type(self)(self.button + 1, self.street, True, bids, self.pips, self.stacks, self.hands, self.deck, self)
+            # both players have submitted bids and we deal the extra card
+            stack0, stack1 = self.stacks
+            if bids[0] == bids[1]:  # both players receive a card and pay their bid
+                stack0 -= bids[0]
+                stack1 -= bids[1]
+            elif bids[0] > bids[1]:  # the winner pays the loser's bid
+                stack0 -= bids[1]
+            else:
+                stack1 -= bids[0]
+            return type(self)(1, self.street, False, bids, self.pips, (stack0, stack1), self.auction_hands(bids), self.deck, self)
+        # action_type is RaiseAction
+        pip0, pip1 = self.pips
+        stack0, stack1 = self.stacks
+        if active == 0:
+            stack0 -= action.amount - pip0
+            pip0 = action.amount
+        else:
+            stack1 -= action.amount - pip1
+            pip1 = action.amount
+        return type(self)(self.button + 1, self.street, self.auction, self.bids, (pip0, pip1), (stack0, stack1), self.hands, self.deck, self)
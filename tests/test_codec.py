@@ -0,0 +1,139 @@
+'''
+Checks the protocol codec the engine and the bots share.
+
+Every action and clause the engine sends or parses and the runner decodes or
+sends is round-tripped through random values, including the eval7 cards the
+engine encodes, and the codec must keep a loose minimum throughput so a
+protocol change can not silently slow either end. Run with python3 -m pytest
+tests, or python3 tests/test_codec.py to print the throughput.
+'''
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import eval7
+import pytest
+from rules.actions import FoldAction, CallAction, CheckAction, RaiseAction, BidAction
+from rules.codec import ACTION_TYPES, encode_action, decode_action, encode_clause, decode_clause
+
+NUM_CLAUSES = 100000
+CARDS = [rank + suit for rank in '23456789TJQKA' for suit in 'cdhs']
+# about ten times below a typical run, so only an order of magnitude slowdown fails
+MIN_MESSAGES_PER_SECOND = 20000
+MIN_ACTIONS_PER_SECOND = 100000
+
+
+def random_cards(rng, low, high):
+    '''
+    Returns card strings as the bots hold them, or eval7 cards as the engine encodes them, with the expected decoding.
+    '''
+    cards = rng.sample(CARDS, rng.randint(low, high))
+    return (list(map(eval7.Card, cards)) if rng.random() < 0.5 else cards), cards
+
+
+def random_clause(rng):
+    '''
+    Returns an encoded random clause and the (code, value) it must decode to.
+    '''
+    code = rng.choice('TPHFCKRANBODQ')
+    if code in ACTION_TYPES:
+        action_type = ACTION_TYPES[code]
+        action = action_type(rng.randint(0, 400)) if action_type._fields else action_type()
+        return encode_action(action), (code, action)
+    if code == 'T':
+        value = expected = round(rng.uniform(0., 30.), 3)
+    elif code == 'P':
+        value = expected = rng.randint(0, 1)
+    elif code == 'D':
+        value = expected = rng.randint(-400, 400)
+    elif code == 'N':
+        stacks = (rng.randint(0, 400), rng.randint(0, 400))
+        bids = (rng.randint(0, 400), rng.randint(0, 400))
+        hand, cards = random_cards(rng, 2, 3)
+        value, expected = (stacks, bids, hand), (stacks, bids, cards)
+    elif code == 'Q':
+        value = expected = None
+    elif code == 'H' or code == 'O':
+        value, expected = random_cards(rng, 2, 3)
+    else:  # 'B'
+        value, expected = random_cards(rng, 0, 5)
+    return encode_clause(code, value), (code, expected)
+
+
+def test_random_clauses_round_trip():
+    rng = random.Random(0)
+    seen = set()
+    for _ in range(NUM_CLAUSES):
+        clause, expected = random_clause(rng)
+        assert ' ' not in clause and '\n' not in clause, clause
+        assert decode_clause(clause) == expected, (clause, expected)
+        if expected[0] in ACTION_TYPES:
+            # the engine parses responses with decode_action
+            assert decode_action(clause) == expected[1], clause
+        seen.add(expected[0])
+    assert seen == set('TPHFCKRANBODQ'), seen
+
+
+def test_engine_and_runner_clauses():
+    # the literal clock the engine sends with every new hand, and its game over message
+    assert decode_clause('T0.') == ('T', 0.)
+    assert encode_clause('Q') == 'Q'
+    assert decode_clause('Q') == ('Q', None)
+    assert encode_clause('T', 29.98765) == 'T29.988'
+    assert encode_clause('N', ((380, 390), (12, 7), [eval7.Card('Ah'), eval7.Card('2c'), eval7.Card('Td')])) == 'N380,390_12,7_Ah,2c,Td'
+    assert decode_clause('N380,390_12,7_Ah,2c,Td') == ('N', ((380, 390), (12, 7), ['Ah', '2c', 'Td']))
+    assert encode_clause('B', []) == 'B'
+    assert decode_clause('B') == ('B', [])
+    assert decode_clause('D-37') == ('D', -37)
+    for action, clause in ((FoldAction(), 'F'), (CallAction(), 'C'), (CheckAction(), 'K'),
+                           (RaiseAction(25), 'R25'), (BidAction(0), 'A0')):
+        assert encode_action(action) == clause
+        assert decode_action(clause) == action
+        assert ACTION_TYPES[clause[0]] is type(action)
+
+
+@pytest.mark.parametrize('clause', ['', 'X', 'Rabc', 'A', 'R', 'T', 'Pz', 'N1,2_3', 'D1.5'])
+def test_misformatted_clauses_raise(clause):
+    # the engine treats exactly these exceptions as a misformatted response
+    with pytest.raises((IndexError, KeyError, ValueError)):
+        decode_clause(clause)
+    with pytest.raises((IndexError, KeyError, ValueError)):
+        decode_action(clause)
+
+
+def throughput():
+    '''
+    Returns the decoded messages per second and the encoded actions per second.
+    '''
+    rng = random.Random(1)
+    messages = [' '.join(random_clause(rng)[0] for _ in range(rng.randint(1, 8))) for _ in range(10000)]
+    start_time = time.perf_counter()
+    for message in messages:
+        for clause in message.split(' '):
+            decode_clause(clause)
+    decode_time = time.perf_counter() - start_time
+    actions = [decode_action(code + '12') for code in 'FCKRA'] * 20000
+    start_time = time.perf_counter()
+    for action in actions:
+        encode_action(action)
+    encode_time = time.perf_counter() - start_time
+    return len(messages) / decode_time, len(actions) / encode_time
+
+
+def test_throughput():
+    messages_per_second, actions_per_second = throughput()
+    assert messages_per_second > MIN_MESSAGES_PER_SECOND, messages_per_second
+    assert actions_per_second > MIN_ACTIONS_PER_SECOND, actions_per_second
+
+
+if __name__ == '__main__':
+    test_random_clauses_round_trip()
+    test_engine_and_runner_clauses()
+    print('{} random clauses round trip'.format(NUM_CLAUSES))
+    messages_per_second, actions_per_second = throughput()
+    print('decode: {:.0f} messages/s'.format(messages_per_second))
+    print('encode: {:.0f} actions/s'.format(actions_per_second))
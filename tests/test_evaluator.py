@@ -0,0 +1,50 @@
+'''
+Checks the vectorized evaluator, through the shared tables bots map from disk, against eval7.evaluate.
+
+A stale or corrupt stored table would feed wrong hand values to every bot, so
+the tables are compared with freshly built ones and batched 7- and 8-card
+evaluations with eval7 on a fixed-seed sample. Run with python3 -m pytest
+tests, or python3 tests/test_evaluator.py.
+'''
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import eval7
+import numpy as np
+import pytest
+from new_bots.skeleton import evaluator
+from new_bots.skeleton.cards import EVAL7_CARDS
+
+NUM_HANDS = 20000
+
+
+def random_hands(size, rng):
+    '''
+    Returns distinct random cards per hand, half of them drawn from two suits so flushes are well represented.
+    '''
+    cards = np.argsort(rng.random((NUM_HANDS, 52)), axis=1)[:, :size]
+    cards[:NUM_HANDS // 2] = np.argsort(rng.random((NUM_HANDS // 2, 26)), axis=1)[:, :size]
+    return cards
+
+
+def test_stored_tables_match_eval7_build():
+    for stored, built in zip((evaluator.RANK_KEYS, evaluator.RANK_VALUES, evaluator.FLUSH_VALUES), evaluator.build_tables()):
+        assert np.array_equal(stored, built)
+
+
+@pytest.mark.parametrize('size', evaluator.HAND_SIZES)
+def test_batch_matches_eval7(size):
+    cards = random_hands(size, np.random.default_rng(size))
+    values = evaluator.evaluate(cards)
+    expected = [eval7.evaluate([EVAL7_CARDS[card] for card in row]) for row in cards.tolist()]
+    assert values.tolist() == expected
+
+
+if __name__ == '__main__':
+    test_stored_tables_match_eval7_build()
+    for size in evaluator.HAND_SIZES:
+        test_batch_matches_eval7(size)
+    print('the stored tables match eval7 on {} hands of each size'.format(NUM_HANDS))
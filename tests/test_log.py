@@ -0,0 +1,56 @@
+'''
+Checks that the buffered logger can be flushed from several threads at once,
+as a bot's handle_round_over and the background flushing thread do.
+Run with python3 -m pytest tests, or python3 tests/test_log.py.
+'''
+import io
+import os
+import sys
+from threading import Thread
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from new_bots.skeleton.log import Logger, INFO
+
+NUM_RECORDS = 200000
+NUM_FLUSHERS = 2
+
+
+def test_concurrent_flushes_write_every_record_once():
+    stream = io.StringIO()
+    logger = Logger(INFO, capacity=NUM_RECORDS, stream=stream)
+    errors = []
+    done = []
+
+    def produce():
+        for index in range(NUM_RECORDS):
+            logger.info('%d', index)
+        done.append(True)
+
+    def flush():
+        try:
+            while not done:
+                logger.flush()
+            logger.flush()
+        except Exception as error:
+            errors.append(error)
+    switch_interval = sys.getswitchinterval()
+    # switch threads as often as possible so flushes overlap
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [Thread(target=produce)] + [Thread(target=flush) for _ in range(NUM_FLUSHERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+    assert not errors, errors
+    # each flush writes its lines in one piece, so the records come out once and in order
+    assert stream.getvalue().split() == [str(index) for index in range(NUM_RECORDS)]
+
+
+if __name__ == '__main__':
+    test_concurrent_flushes_write_every_record_once()
+    print('{} threads flushed {} records without losing or repeating any'.format(NUM_FLUSHERS, NUM_RECORDS))
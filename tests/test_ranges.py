@@ -0,0 +1,111 @@
+'''
+Checks range-weighted equity against brute force, and the stratified estimator and
+its reported standard error against plain sampling and enumeration.
+Run with python3 -m pytest tests, or python3 tests/test_ranges.py.
+'''
+from itertools import combinations
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import eval7
+import numpy as np
+import pytest
+from new_bots.skeleton.cards import CARD_STRINGS, EVAL7_CARDS, card_indices
+from new_bots.skeleton.equity import batch_equity, exact_equity
+from new_bots.skeleton.ranges import RANGE_SIZES, COMBOS, combo_index, range_equity, stratified_equity, uniform_range
+
+RIVERS = ((('Ad', 'Kd'), ('Qd', 'Jd', '3s', '4h', '9c'), 2),
+          (('7c', '7h'), ('7d', 'Ks', 'Kc', '2h', '2s'), 2),
+          (('Ad', 'Kd', '2c'), ('Qd', 'Jd', '3s', '4h', '9c'), 3))
+# a flop against plain sampling and a turn against enumeration, at fewer deals than live
+# holdings (a subset of holdings is drawn) and at more (every holding is covered)
+STRATIFIED = ((('Qd', 'Jc'), ('Ah', 'Kd', '2s')), (('7c', '7h'), ('Qd', 'Jd', '3s', '4h')))
+STRATIFIED_SAMPLES = (3000, 20000)
+REPEATS = 40
+
+
+def brute_force_equity(my_cards, board_cards, weights):
+    '''
+    Evaluates every opponent combo one by one with eval7 and weighs the results.
+    '''
+    size = 2 if len(weights) == RANGE_SIZES[2] else 3
+    known = set(card_indices(my_cards) + card_indices(board_cards))
+    board = [EVAL7_CARDS[card] for card in card_indices(board_cards)]
+    our_value = eval7.evaluate([EVAL7_CARDS[card] for card in card_indices(my_cards)] + board)
+    win = tie = total = 0.
+    for index, combo in enumerate(combinations(range(52), size)):
+        if known.intersection(combo):
+            continue
+        weight = weights[index]
+        opp_value = eval7.evaluate([EVAL7_CARDS[card] for card in combo] + board)
+        total += weight
+        win += weight * (our_value > opp_value)
+        tie += weight * (our_value == opp_value)
+    return win / total, tie / total
+
+
+def test_combo_index_matches_table_order():
+    for size in RANGE_SIZES:
+        for index in range(0, RANGE_SIZES[size], 97):
+            assert combo_index([CARD_STRINGS[card] for card in COMBOS[size][index]]) == index
+
+
+@pytest.mark.parametrize('my_cards, board_cards, opp', RIVERS)
+def test_river_range_equity_matches_brute_force(my_cards, board_cards, opp):
+    rng = np.random.default_rng(combo_index(my_cards))
+    # uneven weights with a third of the range excluded
+    weights = rng.random(RANGE_SIZES[opp]) * (rng.random(RANGE_SIZES[opp]) < 2 / 3)
+    for weights in (weights, uniform_range(opp)):
+        result = range_equity(my_cards, board_cards, weights)
+        win, tie = brute_force_equity(my_cards, board_cards, weights)
+        assert result.win == pytest.approx(win, abs=1e-12)
+        assert result.tie == pytest.approx(tie, abs=1e-12)
+        assert result.equity == pytest.approx(win + tie / 2, abs=1e-12)
+        assert result.std_error == 0.
+
+
+def test_dead_range_has_no_equity():
+    weights = np.zeros(RANGE_SIZES[2])
+    # the only weighted combo holds one of our cards
+    weights[combo_index(['Ad', '2c'])] = 1.
+    assert range_equity(['Ad', 'Kd'], ['Qd', 'Jd', '3s', '4h', '9c'], weights) is None
+
+
+def test_stratified_river_is_exact():
+    my_cards, board_cards, opp = RIVERS[0]
+    result = stratified_equity(my_cards, board_cards, 100, opp)
+    assert result.equity == pytest.approx(exact_equity(my_cards, board_cards, opp), abs=1e-12)
+    assert result.std_error == 0.
+
+
+@pytest.mark.parametrize('my_cards, board_cards', STRATIFIED)
+def test_stratified_agrees_with_plain_sampling(my_cards, board_cards):
+    if len(board_cards) == 4:
+        reference, reference_error = exact_equity(my_cards, board_cards, 2), 0.
+    else:
+        plain = batch_equity(my_cards, board_cards, 400000, 0, 2, np.random.default_rng(0))
+        reference, reference_error = plain.equity, plain.std_error
+    rng = np.random.default_rng(1)
+    for samples in STRATIFIED_SAMPLES:
+        results = [stratified_equity(my_cards, board_cards, samples, 2, rng=rng) for _ in range(REPEATS)]
+        equities = np.array([result.equity for result in results])
+        errors = np.array([result.std_error for result in results])
+        # every estimate lies within four of its standard errors of the reference
+        assert (np.abs(equities - reference) < 4 * np.sqrt(errors ** 2 + reference_error ** 2)).all(), (samples, equities, errors)
+        # and the reported standard error matches the spread actually observed over repeats
+        assert 0.6 < equities.std(ddof=1) / errors.mean() < 1.6, (samples, equities.std(ddof=1), errors.mean())
+
+
+if __name__ == '__main__':
+    test_combo_index_matches_table_order()
+    for river in RIVERS:
+        test_river_range_equity_matches_brute_force(*river)
+    test_dead_range_has_no_equity()
+    print('range equity matches brute force on {} rivers'.format(len(RIVERS)))
+    test_stratified_river_is_exact()
+    for situation in STRATIFIED:
+        test_stratified_agrees_with_plain_sampling(*situation)
+    print('stratified equity agrees with plain sampling within its reported standard error')
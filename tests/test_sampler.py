@@ -0,0 +1,77 @@
+'''
+Checks that the partial Fisher-Yates sampler draws distinct cards uniformly.
+
+Every card must land in every drawn position, and every ordered pair of cards
+in the first two positions, about equally often. A chi-square statistic over
+those counts must stay within five of its standard deviations of its mean.
+Run with python3 -m pytest tests, or python3 tests/test_sampler.py.
+'''
+from math import sqrt
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from new_bots.skeleton.sampler import draw, draw_batch
+
+# the 47 cards left after our two hole cards and the flop, as evaluator integers
+DECK = np.array([card for card in range(52) if card not in (0, 13, 26, 39, 51)])
+K = 7
+BATCH_SAMPLES = 200000
+SINGLE_SAMPLES = 50000
+
+
+def assert_uniform(counts):
+    '''
+    Asserts that counts over equally likely cells pass a chi-square test.
+    '''
+    counts = np.asarray(counts, dtype=np.float64).ravel()
+    expected = counts.sum() / len(counts)
+    statistic = ((counts - expected) ** 2 / expected).sum()
+    dof = len(counts) - 1
+    assert abs(statistic - dof) < 5 * sqrt(2 * dof), (statistic, dof)
+
+
+def assert_uniform_draws(draws, deck):
+    '''
+    Checks that rows hold distinct deck cards and that positions and first-two pairs are uniform.
+    '''
+    positions = {card: position for position, card in enumerate(deck.tolist())}
+    draws = np.vectorize(positions.__getitem__)(draws)
+    ordered = np.sort(draws, axis=1)
+    assert (ordered[:, 1:] != ordered[:, :-1]).all()
+    for position in range(draws.shape[1]):
+        assert_uniform(np.bincount(draws[:, position], minlength=len(deck)))
+    pairs = np.bincount(draws[:, 0] * len(deck) + draws[:, 1], minlength=len(deck) ** 2).reshape(len(deck), len(deck))
+    assert not np.diagonal(pairs).any()
+    assert_uniform(pairs[~np.eye(len(deck), dtype=bool)])
+
+
+def test_draw_batch_is_uniform():
+    draws = draw_batch(DECK, BATCH_SAMPLES, K, np.random.default_rng(0))
+    assert draws.shape == (BATCH_SAMPLES, K) and draws.dtype == np.int64
+    assert_uniform_draws(draws, DECK)
+
+
+def test_draw_is_uniform():
+    rng = random.Random(0)
+    deck = DECK.tolist()
+    draws = np.array([draw(deck, K, rng) for _ in range(SINGLE_SAMPLES)])
+    assert_uniform_draws(draws, DECK)
+    # the deck passed in is left as it was
+    assert deck == DECK.tolist()
+
+
+def test_seeded_draws_repeat():
+    assert np.array_equal(draw_batch(DECK, 10, K, np.random.default_rng(2)), draw_batch(DECK, 10, K, np.random.default_rng(2)))
+    assert draw(DECK.tolist(), K, random.Random(2)) == draw(DECK.tolist(), K, random.Random(2))
+
+
+if __name__ == '__main__':
+    test_draw_batch_is_uniform()
+    test_draw_is_uniform()
+    test_seeded_draws_repeat()
+    print('draw and draw_batch are uniform over {} and {} samples'.format(SINGLE_SAMPLES, BATCH_SAMPLES))
@@ -0,0 +1,266 @@
+'''
+Checks the shared RoundState rules against the rules the engine and the bots had before they were merged.
+
+Random action sequences, including tied auctions, are replayed through a
+frozen copy of the original engine and skeleton RoundState classes and
+through the shared ones, comparing every state, legal action set, bound,
+delta and bid. Run with python3 -m pytest tests, or python3 tests/test_states.py.
+'''
+from collections import namedtuple
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import eval7
+import engine
+from rules import states
+from rules.actions import FoldAction, CallAction, CheckAction, RaiseAction, BidAction
+
+NUM_SEQUENCES = 20000
+STARTING_STACK = 400
+BIG_BLIND = 2
+SMALL_BLIND = 1
+
+BaselineTerminalState = namedtuple('TerminalState', ['deltas', 'bids', 'previous_state'])
+
+
+class BaselineRoundState(namedtuple('_RoundState', ['button', 'street', 'auction', 'bids', 'pips', 'stacks', 'hands', 'deck', 'previous_state'])):
+    '''
+    The skeleton's RoundState before the rules were shared, without docstrings.
+    '''
+
+    def showdown(self):
+        return BaselineTerminalState([0, 0], self.bids, self)
+
+    def legal_actions(self):
+        if self.auction:
+            return {BidAction}
+        active = self.button % 2
+        continue_cost = self.pips[1-active] - self.pips[active]
+        if continue_cost == 0:
+            bets_forbidden = (self.stacks[0] == 0 or self.stacks[1] == 0)
+            return {CheckAction} if bets_forbidden else {CheckAction, RaiseAction}
+        raises_forbidden = (continue_cost >= self.stacks[active] or self.stacks[1-active] == 0)
+        return {FoldAction, CallAction} if raises_forbidden else {FoldAction, CallAction, RaiseAction}
+
+    def raise_bounds(self):
+        active = self.button % 2
+        continue_cost = self.pips[1-active] - self.pips[active]
+        max_contribution = min(self.stacks[active], self.stacks[1-active] + continue_cost)
+        min_contribution = min(max_contribution, continue_cost + max(continue_cost, BIG_BLIND))
+        return (self.pips[active] + min_contribution, self.pips[active] + max_contribution)
+
+    def proceed_street(self):
+        if self.street == 5:
+            return self.showdown()
+        if self.street == 0:
+            return BaselineRoundState(1, 3, True, self.bids, [0, 0], self.stacks, self.hands, self.deck, self)
+        return BaselineRoundState(1, self.street + 1, False, self.bids, [0, 0], self.stacks, self.hands, self.deck, self)
+
+    def proceed(self, action):
+        active = self.button % 2
+        if isinstance(action, FoldAction):
+            delta = self.stacks[0] - STARTING_STACK if active == 0 else STARTING_STACK - self.stacks[1]
+            return BaselineTerminalState([delta, -delta], self.bids, self)
+        if isinstance(action, CallAction):
+            if self.button == 0:
+                return BaselineRoundState(1, 0, self.auction, self.bids, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.deck, self)
+            new_pips = list(self.pips)
+            new_stacks = list(self.stacks)
+            contribution = new_pips[1-active] - new_pips[active]
+            new_stacks[active] -= contribution
+            new_pips[active] += contribution
+            state = BaselineRoundState(self.button + 1, self.street, self.auction, self.bids, new_pips, new_stacks, self.hands, self.deck, self)
+            return state.proceed_street()
+        if isinstance(action, CheckAction):
+            if (self.street == 0 and self.button > 0) or self.button > 1:
+                return self.proceed_street()
+            return BaselineRoundState(self.button + 1, self.street, self.auction, self.bids, self.pips, self.stacks, self.hands, self.deck, self)
+        if isinstance(action, BidAction):
+            self.bids[active] = action.amount
+            if None not in self.bids:
+                if self.bids[0] == self.bids[1]:
+                    new_stacks = list(self.stacks)
+                    new_stacks[0] -= self.bids[0]
+                    new_stacks[1] -= self.bids[1]
+                    state = BaselineRoundState(1, self.street, False, self.bids, self.pips, new_stacks, self.hands, self.deck, self)
+                else:
+                    winner = self.bids.index(max(self.bids))
+                    new_stacks = list(self.stacks)
+                    new_stacks[winner] -= self.bids[1 - winner]
+                    state = BaselineRoundState(1, self.street, False, self.bids, self.pips, new_stacks, self.hands, self.deck, self)
+                return state
+            return BaselineRoundState(self.button + 1, self.street, True, self.bids, self.pips, self.stacks, self.hands, self.deck, self)
+        new_pips = list(self.pips)
+        new_stacks = list(self.stacks)
+        contribution = action.amount - new_pips[active]
+        new_stacks[active] -= contribution
+        new_pips[active] += contribution
+        return BaselineRoundState(self.button + 1, self.street, self.auction, self.bids, new_pips, new_stacks, self.hands, self.deck, self)
+
+
+class BaselineEngineRoundState(namedtuple('_RoundState', ['button', 'street', 'auction', 'bids', 'pips', 'stacks', 'hands', 'deck', 'previous_state'])):
+    '''
+    The engine's RoundState before the rules were shared, without docstrings.
+    '''
+
+    def showdown(self):
+        score0 = eval7.evaluate(self.deck.peek(5) + self.hands[0])
+        score1 = eval7.evaluate(self.deck.peek(5) + self.hands[1])
+        if score0 > score1:
+            delta = STARTING_STACK - self.stacks[1]
+        elif score0 < score1:
+            delta = self.stacks[0] - STARTING_STACK
+        else:
+            delta = (self.stacks[0] - self.stacks[1]) // 2
+        return BaselineTerminalState([delta, -delta], self.bids, self)
+
+    legal_actions = BaselineRoundState.legal_actions
+    raise_bounds = BaselineRoundState.raise_bounds
+
+    def bid_bounds(self):
+        active = self.button % 2
+        return (0, self.stacks[active])
+
+    def proceed_street(self):
+        if self.street == 5:
+            return self.showdown()
+        if self.street == 0:
+            return BaselineEngineRoundState(1, 3, True, self.bids, [0, 0], self.stacks, self.hands, self.deck, self)
+        return BaselineEngineRoundState(1, self.street + 1, False, self.bids, [0, 0], self.stacks, self.hands, self.deck, self)
+
+    def proceed(self, action):
+        active = self.button % 2
+        if isinstance(action, FoldAction):
+            delta = self.stacks[0] - STARTING_STACK if active == 0 else STARTING_STACK - self.stacks[1]
+            return BaselineTerminalState([delta, -delta], self.bids, self)
+        if isinstance(action, CallAction):
+            if self.button == 0:
+                return BaselineEngineRoundState(1, 0, self.auction, self.bids, [BIG_BLIND] * 2, [STARTING_STACK - BIG_BLIND] * 2, self.hands, self.deck, self)
+            new_pips = list(self.pips)
+            new_stacks = list(self.stacks)
+            contribution = new_pips[1-active] - new_pips[active]
+            new_stacks[active] -= contribution
+            new_pips[active] += contribution
+            state = BaselineEngineRoundState(self.button + 1, self.street, self.auction, self.bids, new_pips, new_stacks, self.hands, self.deck, self)
+            return state.proceed_street()
+        if isinstance(action, CheckAction):
+            if (self.street == 0 and self.button > 0) or self.button > 1:
+                return self.proceed_street()
+            return BaselineEngineRoundState(self.button + 1, self.street, self.auction, self.bids, self.pips, self.stacks, self.hands, self.deck, self)
+        if isinstance(action, BidAction):
+            self.bids[active] = action.amount
+            if None not in self.bids:
+                if self.bids[0] == self.bids[1]:
+                    self.hands[0].append(self.deck.peek(48)[-1])
+                    self.hands[1].append(self.deck.peek(48)[-2])
+                    new_stacks = list(self.stacks)
+                    new_stacks[0] -= self.bids[0]
+                    new_stacks[1] -= self.bids[1]
+                    state = BaselineEngineRoundState(1, self.street, False, self.bids, self.pips, new_stacks, self.hands, self.deck, self)
+                else:
+                    winner = self.bids.index(max(self.bids))
+                    self.hands[winner].append(self.deck.peek(48)[-1])
+                    new_stacks = list(self.stacks)
+                    new_stacks[winner] -= self.bids[1 - winner]
+                    state = BaselineEngineRoundState(1, self.street, False, self.bids, self.pips, new_stacks, self.hands, self.deck, self)
+                return state
+            return BaselineEngineRoundState(self.button + 1, self.street, True, self.bids, self.pips, self.stacks, self.hands, self.deck, self)
+        new_pips = list(self.pips)
+        new_stacks = list(self.stacks)
+        contribution = action.amount - new_pips[active]
+        new_stacks[active] -= contribution
+        new_pips[active] += contribution
+        return BaselineEngineRoundState(self.button + 1, self.street, self.auction, self.bids, new_pips, new_stacks, self.hands, self.deck, self)
+
+
+class FixedDeck():
+    '''
+    The part of eval7.Deck the rules use, holding the 48 cards left after the hands are dealt.
+    '''
+
+    def __init__(self, cards):
+        self.cards = cards
+
+    def peek(self, count):
+        return self.cards[:count]
+
+
+def random_action(state, rng):
+    '''
+    Picks a legal action for the active player, bidding the other player's bid about a third of the time.
+    '''
+    legal_actions = state.legal_actions()
+    if BidAction in legal_actions:
+        other_bid = state.bids[1 - state.button % 2]
+        if other_bid is not None and other_bid <= state.stacks[state.button % 2] and rng.random() < 0.35:
+            return BidAction(other_bid)
+        return BidAction(rng.choice((0, 0, rng.randint(0, 10), rng.randint(0, state.stacks[state.button % 2]))))
+    action_type = rng.choice(sorted(legal_actions, key=lambda action: action.__name__))
+    if action_type is RaiseAction:
+        low, high = state.raise_bounds()
+        return RaiseAction(rng.choice((low, high, rng.randint(low, high))))
+    return action_type()
+
+
+def snapshot(state, with_bid_bounds=True):
+    '''
+    Returns everything the rules decide about a state, in plain tuples so list and tuple fields compare equal.
+    The baseline skeleton had no bid_bounds, so the bot side leaves them out.
+    '''
+    if isinstance(state, (BaselineTerminalState, states.TerminalState)):
+        return ('terminal', tuple(state.deltas), tuple(state.bids))
+    hands = tuple(tuple(str(card) for card in hand) for hand in state.hands)
+    result = (state.button, state.street, state.auction, tuple(state.bids), tuple(state.pips), tuple(state.stacks), hands,
+              frozenset(state.legal_actions()), state.raise_bounds())
+    if with_bid_bounds:
+        result += (state.bid_bounds(),)
+    return result
+
+
+def replay(seed):
+    '''
+    Plays one random round through both the baseline and the shared rules, on the engine and the bot side.
+    '''
+    rng = random.Random(seed)
+    cards = [eval7.Card(rank + suit) for rank in '23456789TJQKA' for suit in 'cdhs']
+    rng.shuffle(cards)
+    hands = cards[:2], cards[2:4]
+    deck = FixedDeck(cards[4:])
+    pips = [SMALL_BLIND, BIG_BLIND]
+    stacks = [STARTING_STACK - SMALL_BLIND, STARTING_STACK - BIG_BLIND]
+    baseline_engine = BaselineEngineRoundState(0, 0, False, [None, None], list(pips), list(stacks), [list(hands[0]), list(hands[1])], deck, None)
+    shared_engine = engine.RoundState(0, 0, False, (None, None), tuple(pips), tuple(stacks), (list(hands[0]), list(hands[1])), deck, None)
+    # the bots see only their own hand and no deck
+    baseline_bot = BaselineRoundState(0, 0, False, [None, None], list(pips), list(stacks), [[], []], [], None)
+    shared_bot = states.RoundState(0, 0, False, (None, None), tuple(pips), tuple(stacks), ((), ()), (), None)
+    while True:
+        expected = snapshot(baseline_engine)
+        assert snapshot(shared_engine) == expected, (seed, expected, snapshot(shared_engine))
+        assert snapshot(shared_bot, False) == snapshot(baseline_bot, False), (seed, snapshot(baseline_bot, False), snapshot(shared_bot, False))
+        if expected[0] == 'terminal':
+            return expected
+        assert shared_bot.bid_bounds() == expected[-1], (seed, expected, shared_bot.bid_bounds())
+        action = random_action(baseline_engine, rng)
+        baseline_engine = baseline_engine.proceed(action)
+        shared_engine = shared_engine.proceed(action)
+        baseline_bot = baseline_bot.proceed(action)
+        shared_bot = shared_bot.proceed(action)
+
+
+def test_random_rounds_match_baseline():
+    tied_auctions = 0
+    for seed in range(NUM_SEQUENCES):
+        final = replay(seed)
+        bids = final[2]
+        tied_auctions += None not in bids and bids[0] == bids[1]
+    # the generator must actually reach tied auctions for them to be covered
+    assert tied_auctions > NUM_SEQUENCES // 20, tied_auctions
+
+
+if __name__ == '__main__':
+    test_random_rounds_match_baseline()
+    print('{} random rounds match the baseline rules'.format(NUM_SEQUENCES))
@@ -0,0 +1,341 @@
+'''
+Distributes engine matches across worker processes, possibly on other machines.
+
+A coordinator reads a jobs file and hands out one match at a time over TCP.
+Workers run each match with the engine in a fresh process and send the results
+back, which the coordinator merges into its results database. Jobs held by a
+worker that disconnects or stops sending heartbeats are re-queued.
+
+Jobs file format (JSON):
+
+[
+    {"players": [["4.2", "./new_bots"], ["4.1", "./old_bots"]],
+     "seed": 1, "repeat": 10, "config": {"NUM_ROUNDS": 500}}
+]
+
+Usage:
+
+python3 tournament.py coordinator jobs.json --port 5050
+python3 tournament.py worker --host coordinator-host --port 5050
+python3 tournament.py local jobs.json --workers 4
+'''
+
+from collections import deque
+from threading import Condition, Thread
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import socket
+import socketserver
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(ROOT)
+from results import ResultsStore
+
+HEARTBEAT_INTERVAL = 5.
+HEARTBEAT_TIMEOUT = 30.
+WAIT_INTERVAL = 1.
+CONNECT_TIMEOUT = 10.
+MAX_ATTEMPTS = 3
+MATCHES_DIRECTORY = 'matches'
+
+# Job protocol, one JSON object per line:
+#
+# worker -> coordinator
+# {"type": "ready"} request a job
+# {"type": "heartbeat", "id": #} the job is still running
+# {"type": "result", "id": #, "match": [...], "rounds": [[...], ...]} the job finished
+# {"type": "failed", "id": #, "error": "..."} the job could not be played
+#
+# coordinator -> worker
+# {"type": "job", "id": #, "attempt": #, "players": [[name, path], [name, path]], "seed": #, "config": {...}}
+# {"type": "wait"} no job is available right now, ask again later
+# {"type": "done"} every job has finished
+
+
+def send_message(socketfile, message):
+    '''
+    Writes one message to the job protocol stream.
+    '''
+    socketfile.write(json.dumps(message) + '\n')
+    socketfile.flush()
+
+
+def receive_message(socketfile):
+    '''
+    Reads one message from the job protocol stream, or returns None at EOF.
+    '''
+    line = socketfile.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def load_jobs(filename):
+    '''
+    Expands a jobs file into a list of numbered jobs.
+    '''
+    with open(filename, 'r') as json_file:
+        specs = json.load(json_file)
+    jobs = []
+    for spec in specs:
+        seed = spec.get('seed', random.randrange(2 ** 32))
+        for i in range(spec.get('repeat', 1)):
+            jobs.append({'type': 'job', 'id': len(jobs), 'players': spec['players'],
+                         'seed': seed + i, 'config': spec.get('config', {})})
+    return jobs
+
+
+class Coordinator():
+    '''
+    Tracks pending, running and finished jobs.
+    '''
+
+    def __init__(self, jobs, store):
+        self.pending = deque(jobs)
+        self.running = {}
+        self.attempts = {job['id']: 0 for job in jobs}
+        self.finished = {}
+        self.failed = {}
+        self.store = store
+        self.condition = Condition()
+
+    def done(self):
+        '''
+        Returns True once no job is pending or running.
+        '''
+        return not self.pending and not self.running
+
+    def next_job(self):
+        '''
+        Returns the next job message, or a wait/done message if there is none to hand out.
+        '''
+        with self.condition:
+            if self.pending:
+                job = self.pending.popleft()
+                self.running[job['id']] = job
+                self.attempts[job['id']] += 1
+                return dict(job, attempt=self.attempts[job['id']])
+            return {'type': 'done'} if self.done() else {'type': 'wait'}
+
+    def finish(self, job_id, match, rounds):
+        '''
+        Stores the results of a finished job.
+        '''
+        with self.condition:
+            job = self.running.pop(job_id, None)
+            if job is None:  # already re-queued and finished by another worker
+                return
+            self.finished[job_id] = self.store.import_match(match, rounds)
+            print('Finished job', job_id, '-', match[2], '({})'.format(match[7]), 'vs', match[4], '({})'.format(match[8]))
+            self.condition.notify_all()
+
+    def requeue(self, job_id, reason):
+        '''
+        Puts a running job back on the queue, unless it has been attempted too often.
+        '''
+        with self.condition:
+            job = self.running.pop(job_id, None)
+            if job is None:
+                return
+            if self.attempts[job_id] < MAX_ATTEMPTS:
+                print('Re-queuing job', job_id, '-', reason)
+                self.pending.appendleft(job)
+            else:
+                print('Giving up on job', job_id, '-', reason)
+                self.failed[job_id] = reason
+            self.condition.notify_all()
+
+    def wait(self):
+        '''
+        Blocks until every job has finished or failed.
+        '''
+        with self.condition:
+            while not self.done():
+                self.condition.wait()
+
+    def summary(self):
+        '''
+        Returns each bot's total bankroll over the finished matches.
+        '''
+        totals = {}
+        for match_id in self.finished.values():
+            match, _ = self.store.export_match(match_id)
+            for name, bankroll in ((match[2], match[7]), (match[4], match[8])):
+                totals[name] = totals.get(name, 0) + (bankroll or 0)
+        return totals
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    '''
+    Serves one worker connection.
+    '''
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        self.request.settimeout(HEARTBEAT_TIMEOUT)
+        socketfile = self.request.makefile('rw')
+        job_id = None
+        try:
+            while True:
+                message = receive_message(socketfile)
+                if message is None:
+                    break
+                if message['type'] == 'ready':
+                    reply = coordinator.next_job()
+                    job_id = reply.get('id')
+                    send_message(socketfile, reply)
+                    if reply['type'] == 'done':
+                        break
+                elif message['type'] == 'result':
+                    coordinator.finish(message['id'], message['match'], message['rounds'])
+                    job_id = None
+                elif message['type'] == 'failed':
+                    coordinator.requeue(message['id'], 'worker reported ' + message['error'])
+                    job_id = None
+        except socket.timeout:
+            pass
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            if job_id is not None:
+                coordinator.requeue(job_id, 'worker {}:{} lost'.format(*self.client_address[:2]))
+            socketfile.close()
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def run_coordinator(jobs, port, results_filename):
+    '''
+    Hands out jobs to workers until all of them have finished.
+    '''
+    store = ResultsStore(results_filename)
+    coordinator = Coordinator(jobs, store)
+    server = CoordinatorServer(('', port), WorkerHandler)
+    server.coordinator = coordinator
+    Thread(target=server.serve_forever, daemon=True).start()
+    print('Coordinator listening on port', server.server_address[1], 'with', len(jobs), 'jobs')
+    coordinator.wait()
+    server.shutdown()
+    server.server_close()
+    for name, bankroll in sorted(coordinator.summary().items(), key=lambda item: -item[1]):
+        print('{:>12} {:>10}'.format(name, bankroll))
+    for job_id, reason in coordinator.failed.items():
+        print('Job', job_id, 'failed:', reason)
+    store.close()
+    return coordinator
+
+
+def play_match(job, root, connection):
+    '''
+    Runs one match with the engine. Called in a fresh process so config overrides do not leak.
+    '''
+    os.chdir(root)
+    sys.path.append(root)
+    import config
+    for key, value in job['config'].items():
+        setattr(config, key, value)
+    (config.PLAYER_1_NAME, path_1), (config.PLAYER_2_NAME, path_2) = job['players']
+    config.PLAYER_1_PATH = os.path.abspath(path_1)
+    config.PLAYER_2_PATH = os.path.abspath(path_2)
+    match_directory = os.path.abspath(os.path.join(MATCHES_DIRECTORY, '{}_{}'.format(job['id'], job['attempt'])))
+    os.makedirs(match_directory, exist_ok=True)
+    results_filename = os.path.join(match_directory, 'results.db')
+    if os.path.exists(results_filename):
+        os.remove(results_filename)
+    config.GAME_LOG_FILENAME = os.path.join(match_directory, 'gamelog')
+    config.RESULTS_DB_FILENAME = results_filename
+    os.chdir(match_directory)  # player logs are written to the working directory
+    random.seed(job['seed'])
+    import engine
+    engine.Game().run()
+    store = ResultsStore(results_filename)
+    match, rounds = store.export_match(1)
+    store.close()
+    connection.send((list(match), [list(row) for row in rounds]))
+    connection.close()
+
+
+def run_worker(host, port, root):
+    '''
+    Requests jobs from a coordinator and plays them until there are none left.
+    '''
+    deadline = time.perf_counter() + CONNECT_TIMEOUT
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except OSError:
+            if time.perf_counter() > deadline:
+                print('Could not connect to {}:{}'.format(host, port))
+                return
+            time.sleep(WAIT_INTERVAL)
+    socketfile = sock.makefile('rw')
+    context = multiprocessing.get_context('spawn')
+    while True:
+        send_message(socketfile, {'type': 'ready'})
+        job = receive_message(socketfile)
+        if job is None or job['type'] == 'done':
+            break
+        if job['type'] == 'wait':
+            time.sleep(WAIT_INTERVAL)
+            continue
+        receiver, sender = context.Pipe(duplex=False)
+        process = context.Process(target=play_match, args=(job, root, sender))
+        process.start()
+        sender.close()
+        while not receiver.poll(HEARTBEAT_INTERVAL):
+            if not process.is_alive():
+                break
+            send_message(socketfile, {'type': 'heartbeat', 'id': job['id']})
+        try:
+            match, rounds = receiver.recv()
+            send_message(socketfile, {'type': 'result', 'id': job['id'], 'match': match, 'rounds': rounds})
+        except EOFError:
+            send_message(socketfile, {'type': 'failed', 'id': job['id'], 'error': 'exit code {}'.format(process.exitcode)})
+        process.join()
+    socketfile.close()
+    sock.close()
+
+
+def parse_args():
+    '''
+    Parses the command line for the coordinator, worker and local modes.
+    '''
+    parser = argparse.ArgumentParser(prog='python3 tournament.py')
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+    coordinator = subparsers.add_parser('coordinator', help='Hand out the jobs in a jobs file')
+    coordinator.add_argument('jobs', type=str, help='JSON jobs file')
+    coordinator.add_argument('--port', type=int, default=5050, help='Port to listen on, defaults to 5050')
+    coordinator.add_argument('--results', type=str, default='results.db', help='Results database, defaults to results.db')
+    worker = subparsers.add_parser('worker', help='Play jobs handed out by a coordinator')
+    worker.add_argument('--host', type=str, default='localhost', help='Coordinator host, defaults to localhost')
+    worker.add_argument('--port', type=int, default=5050, help='Coordinator port, defaults to 5050')
+    local = subparsers.add_parser('local', help='Run a coordinator and several workers on this machine')
+    local.add_argument('jobs', type=str, help='JSON jobs file')
+    local.add_argument('--port', type=int, default=5050, help='Port to listen on, defaults to 5050')
+    local.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of workers, defaults to the CPU count')
+    local.add_argument('--results', type=str, default='results.db', help='Results database, defaults to results.db')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.mode == 'coordinator':
+        run_coordinator(load_jobs(args.jobs), args.port, args.results)
+    elif args.mode == 'worker':
+        run_worker(args.host, args.port, ROOT)
+    else:
+        workers = [subprocess.Popen([sys.executable, os.path.abspath(__file__), 'worker', '--port', str(args.port)])
+                   for _ in range(args.workers)]
+        run_coordinator(load_jobs(args.jobs), args.port, args.results)
+        for worker in workers:
+            worker.wait()